@@ -0,0 +1,4 @@
+-- Expression indexes for case-insensitive login lookups
+-- (WHERE LOWER(username) = %s OR LOWER(email) = %s).
+CREATE INDEX IF NOT EXISTS "users_lower_username_idx" ON "users" (LOWER("username"));
+CREATE INDEX IF NOT EXISTS "users_lower_email_idx" ON "users" (LOWER("email"));
@@ -10,4 +10,4 @@ fit_bp = Blueprint(
     static_url_path="/static/fit",
 )
 
-from clients.fit import routes, api  # noqa: E402, F401
+from clients.fit import routes, api, export, events  # noqa: E402, F401
@@ -1,45 +1,96 @@
-import time
-import threading
+import json
+import math
+import os
 
-from flask import jsonify, request, session
+from flask import Response, jsonify, request, session, url_for
 
 from clients.fit import fit_bp
-from clients.fit.db.fit_cases import build_explore_groups, get_optimal_n
+from clients.fit.db.catalog import get_explore_catalog
+from clients.fit.db.fit_cases import get_optimal_n
+from clients.fit.db.packing import pack_float_columns, quantized_deltas
+from clients.fit.db.queue import get_leaderboard_latency, get_queue_stats
+from clients.fit.db.snapshot import get_snapshot
 from clients.fit.db.submissions import (
     create_fit_submission,
-    get_available_square_counts,
-    get_submission_squares,
+    get_submission_geometry,
+    get_submissions_geometry,
 )
+from clients.fit.db.thumbnails import get_thumbnail
+from clients.fit.references import get_reference
 from shared.auth import verify_token
 from shared.rate_limit import check_rate_limit
 from index_server.db.users import login_user
+from shared.cache import LRUCache
+from shared.ip_limiter import SharedRateLimiter
 
 CHIP_BATCH = 50
-
-_ip_lock = threading.Lock()
-_ip_hits: dict[str, list[float]] = {}
+# Ids accepted by the multi-submission geometry endpoint (one explore page)
+SQUARES_BATCH_MAX = 50
 
 IP_WINDOW = 3600
 IP_MAX_ANON = 10
 IP_MAX_AUTH = 60
+_ip_limiter = SharedRateLimiter("fit-submit-ip", IP_WINDOW)
+
+# Submits are refused with 503 while the validation queue is deeper or older
+# than this. Anonymous users hit scaled-down limits (IP_MAX_ANON/IP_MAX_AUTH)
+# so they are shed first, and are asked to wait proportionally longer.
+QUEUE_MAX_PENDING = int(os.environ.get("QUEUE_MAX_PENDING", 500))
+QUEUE_MAX_AGE_SECONDS = float(os.environ.get("QUEUE_MAX_AGE_SECONDS", 300))
+QUEUE_RETRY_SECONDS = int(os.environ.get("QUEUE_RETRY_SECONDS", 30))
+
+# Geometry of a submission never changes once written; once its status is
+# final the encoded response is cached here and served as immutable.
+FINAL_STATUSES = frozenset({"valid", "invalid"})
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Reference packings can be edited on disk; their ETag follows the file content
+REFERENCE_CACHE_CONTROL = "public, max-age=3600"
+# Representations of a submission's squares: name -> media type. "f64" is
+# the packed float columns as raw bytes; "q" is JSON with delta-encoded
+# integers at Q_SCALE (display precision, not for re-submission).
+SQUARES_FORMATS = {
+    "json": "application/json",
+    "f64": "application/x-fit-squares-f64",
+    "q": "application/x-fit-squares-q+json",
+}
+Q_SCALE = 1_000_000
+_squares_cache = LRUCache(
+    max_entries=int(os.environ.get("SQUARES_CACHE_ENTRIES", 2048)),
+    max_bytes=int(os.environ.get("SQUARES_CACHE_BYTES", 64 * 1024 * 1024)),
+)
+# Thumbnails exist only for valid submissions, so every one is immutable
+_thumbnail_cache = LRUCache(
+    max_entries=int(os.environ.get("THUMBNAIL_CACHE_ENTRIES", 4096)),
+    max_bytes=int(os.environ.get("THUMBNAIL_CACHE_BYTES", 32 * 1024 * 1024)),
+)
+# Submissions without a thumbnail yet (pending, invalid, not backfilled) are
+# cached as b"" this long, so a page of them does not hit the DB every time
+THUMBNAIL_MISS_TTL = 60
 
 
-# Per-IP sliding-window rate check, returns (allowed, retry_after_seconds)
+# Per-IP sliding-window rate check shared by all workers on this host,
+# returns (allowed, retry_after_seconds)
 def _check_ip_rate(ip: str, is_authenticated: bool) -> tuple[bool, int]:
-    now = time.time()
-    cutoff = now - IP_WINDOW
     limit = IP_MAX_AUTH if is_authenticated else IP_MAX_ANON
+    return _ip_limiter.hit(ip, limit)
+
 
-    with _ip_lock:
-        hits = _ip_hits.get(ip, [])
-        hits = [t for t in hits if t > cutoff]
-        if len(hits) >= limit:
-            retry = int(hits[0] - cutoff) + 1
-            _ip_hits[ip] = hits
-            return False, retry
-        hits.append(now)
-        _ip_hits[ip] = hits
-        return True, 0
+# Validation queue backpressure, returns (allowed, retry_after_seconds, stats)
+def _check_queue(is_authenticated: bool):
+    stats = get_queue_stats()
+    if stats is None:
+        return True, 0, None
+    tier = 1.0 if is_authenticated else IP_MAX_ANON / IP_MAX_AUTH
+    overload = max(
+        stats.pending / (QUEUE_MAX_PENDING * tier),
+        stats.oldest_age / (QUEUE_MAX_AGE_SECONDS * tier),
+    )
+    if overload < 1:
+        return True, 0, stats
+    # overload is measured against the tier's limits, so anonymous users
+    # are already asked to wait longer for the same queue
+    retry = math.ceil(QUEUE_RETRY_SECONDS * overload)
+    return False, min(retry, IP_WINDOW), stats
 
 
 
@@ -86,27 +137,198 @@ def api_explore_square_counts():
         limit = min(100, max(1, request.args.get("limit", CHIP_BATCH, type=int)))
     except TypeError:
         offset, limit = 0, CHIP_BATCH
-    from_db = get_available_square_counts()
-    db_by_n = {r["square_count"]: r["submission_count"] for r in from_db}
-    optimal_counts, found_counts = build_explore_groups(db_by_n)
-    if group == "optimal":
-        items = optimal_counts[offset : offset + limit]
-        has_more = len(optimal_counts) > offset + limit
-    else:
-        items = found_counts[offset : offset + limit]
-        has_more = len(found_counts) > offset + limit
+    items, has_more = get_explore_catalog().slice(group, offset, limit)
     return jsonify(items=items, has_more=has_more)
 
 
+def _squares_body(rows, fmt="json"):
+    if fmt == "f64":
+        return pack_float_columns(rows)
+    if fmt == "q":
+        payload = {"n": len(rows), "scale": Q_SCALE, **quantized_deltas(rows, Q_SCALE)}
+    else:
+        payload = {"squares": [
+            {"cx": float(r["cx"]), "cy": float(r["cy"]),
+             "ux": float(r["ux"]), "uy": float(r["uy"])}
+            for r in rows
+        ]}
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+# Representation from ?format=, else from Accept; None if ?format= is unknown
+def _squares_format():
+    fmt = request.args.get("format")
+    if fmt is not None:
+        return fmt if fmt in SQUARES_FORMATS else None
+    best = request.accept_mimetypes.best_match(
+        [SQUARES_FORMATS["json"], SQUARES_FORMATS["f64"], SQUARES_FORMATS["q"]],
+        default=SQUARES_FORMATS["json"],
+    )
+    return next(name for name, mime in SQUARES_FORMATS.items() if mime == best)
+
+
+def _squares_etag(submission_id, fmt="json"):
+    if fmt == "json":
+        return f"fit-sq-v1-{submission_id}"
+    return f"fit-sq-{fmt}-v1-{submission_id}"
+
+
+def _immutable_response(body, etag, mimetype="application/json"):
+    resp = Response(body, mimetype=mimetype)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return resp
+
+
+def _not_modified(etag):
+    resp = Response(status=304)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return resp
+
+
+# Geometry from the mapped snapshot of valid packings (FIT_SNAPSHOT_PATH), or None
+def _snapshot_geometry(submission_id):
+    snapshot = get_snapshot()
+    i = snapshot.find(submission_id) if snapshot is not None else None
+    if i is None:
+        return None
+    return {
+        "status": "valid",
+        "square_count": snapshot.columns["square_count"][i],
+        "squares": snapshot.squares(i),
+    }
+
+
 @fit_bp.route("/api/submission/<int:submission_id>/squares")
 def api_submission_squares(submission_id):
-    rows = get_submission_squares(submission_id)
-    squares = [
-        {"cx": float(r["cx"]), "cy": float(r["cy"]),
-         "ux": float(r["ux"]), "uy": float(r["uy"])}
-        for r in rows
-    ]
-    return jsonify(squares=squares)
+    fmt = _squares_format()
+    if fmt is None:
+        return jsonify(error="format must be one of: " + ", ".join(SQUARES_FORMATS)), 400
+    mimetype = SQUARES_FORMATS[fmt]
+    etag = _squares_etag(submission_id, fmt)
+    # The ETag is only ever issued for final submissions, so a match needs no DB work
+    if request.if_none_match.contains_weak(etag):
+        resp = _not_modified(etag)
+        resp.vary.add("Accept")
+        return resp
+    body = _squares_cache.get((submission_id, fmt))
+    if body is None:
+        geometry = _snapshot_geometry(submission_id) or get_submission_geometry(submission_id)
+        body = _squares_body(geometry["squares"] if geometry else [], fmt)
+        if not geometry or geometry["status"] not in FINAL_STATUSES:
+            resp = Response(body, mimetype=mimetype)
+            resp.vary.add("Accept")
+            return resp
+        _squares_cache.set((submission_id, fmt), body, size=len(body))
+    resp = _immutable_response(body, etag, mimetype)
+    resp.vary.add("Accept")
+    return resp
+
+
+# Geometry of up to SQUARES_BATCH_MAX submissions keyed by id; unknown ids
+# are left out. Bodies come from the same cache as the single-id endpoint.
+# Only the JSON representations (?format=json|q) can be combined.
+@fit_bp.route("/api/submissions/squares")
+def api_submissions_squares():
+    fmt = request.args.get("format", "json")
+    if fmt not in ("json", "q"):
+        return jsonify(error="format must be json or q"), 400
+    try:
+        ids = list(dict.fromkeys(
+            int(part) for part in request.args.get("ids", "").split(",") if part.strip()
+        ))
+    except ValueError:
+        return jsonify(error="ids must be a comma-separated list of integers"), 400
+    if not ids:
+        return jsonify(error="ids is required"), 400
+    if len(ids) > SQUARES_BATCH_MAX:
+        return jsonify(error=f"At most {SQUARES_BATCH_MAX} ids per request."), 400
+    square_count = request.args.get("n", type=int)
+
+    bodies = {}
+    for sid in ids:
+        body = _squares_cache.get((sid, fmt))
+        if body is not None:
+            bodies[sid] = body
+    missing = [sid for sid in ids if sid not in bodies]
+    found = {}
+    for sid in missing:
+        geometry = _snapshot_geometry(sid)
+        if geometry is not None:
+            found[sid] = geometry
+    missing = [sid for sid in missing if sid not in found]
+    if missing:
+        found.update(get_submissions_geometry(missing, square_count))
+    for sid, geometry in found.items():
+        body = _squares_body(geometry["squares"], fmt)
+        if geometry["status"] in FINAL_STATUSES:
+            _squares_cache.set((sid, fmt), body, size=len(body))
+        bodies[sid] = body
+
+    # Cached bodies are already JSON objects, so splice them in as-is
+    out = b",".join(
+        b'"%d":%s' % (sid, bodies[sid]) for sid in ids if sid in bodies
+    )
+    return Response(b'{"submissions":{' + out + b"}}", mimetype="application/json")
+
+
+# Proven optimal or best-known packing for n from data/packings, served from
+# memory in any of the squares formats
+@fit_bp.route("/api/fit/reference/<int:n>")
+def api_fit_reference(n):
+    fmt = _squares_format()
+    if fmt is None:
+        return jsonify(error="format must be one of: " + ", ".join(SQUARES_FORMATS)), 400
+    ref = get_reference(n)
+    if ref is None:
+        return jsonify(error="No reference packing for %d squares." % n), 404
+    etag = f"fit-ref-{fmt}-{ref.digest}"
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+    else:
+        key = ("ref", n, fmt, ref.digest)
+        body = _squares_cache.get(key)
+        if body is None:
+            body = _squares_body(ref.squares, fmt)
+            _squares_cache.set(key, body, size=len(body))
+        resp = Response(body, mimetype=SQUARES_FORMATS[fmt])
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = REFERENCE_CACHE_CONTROL
+    if ref.source:
+        resp.headers["X-Reference-Source"] = ref.source
+    resp.vary.add("Accept")
+    return resp
+
+
+@fit_bp.route("/api/submission/<int:submission_id>/thumbnail")
+def api_submission_thumbnail(submission_id):
+    etag = f"fit-thumb-v1-{submission_id}"
+    if request.if_none_match.contains_weak(etag):
+        return _not_modified(etag)
+    body = _thumbnail_cache.get(submission_id)
+    if body is None:
+        svg = get_thumbnail(submission_id)
+        body = svg.encode() if svg is not None else b""
+        ttl = None if svg is not None else THUMBNAIL_MISS_TTL
+        _thumbnail_cache.set(submission_id, body, size=len(body), ttl=ttl)
+    if not body:
+        resp = jsonify(error="No thumbnail for this submission.")
+        resp.status_code = 404
+        resp.headers["Cache-Control"] = f"public, max-age={THUMBNAIL_MISS_TTL}"
+        return resp
+    return _immutable_response(body, etag, mimetype="image/svg+xml")
+
+
+# Monitoring: validation backlog and time from submit to leaderboard
+@fit_bp.route("/api/fit/queue")
+def api_fit_queue():
+    stats = get_queue_stats()
+    return jsonify(
+        pending=stats.pending if stats else None,
+        oldest_age=round(stats.oldest_age, 1) if stats else None,
+        time_to_leaderboard=get_leaderboard_latency(),
+    )
 
 
 @fit_bp.route("/api/fit/submit", methods=["POST"])
@@ -120,7 +342,19 @@ def api_submit():
     if has_bearer and user_id is None:
         return jsonify(error="Invalid or expired token."), 401
 
-    client_ip = request.headers.get("X-Forwarded-For", request.remote_addr or "")
+    # Before the IP check, so a shed submit does not use up the IP quota
+    queue_ok, queue_retry, queue = _check_queue(is_authenticated=user_id is not None)
+    if not queue_ok:
+        resp = jsonify(
+            error="Validation is running behind. Try again in %d seconds." % queue_retry,
+            queue={"pending": queue.pending, "oldest_age": round(queue.oldest_age)},
+        )
+        resp.status_code = 503
+        resp.headers["Retry-After"] = str(queue_retry)
+        return resp
+
+    # remote_addr is the real client: ProxyFix (main.py) strips trusted proxy hops
+    client_ip = request.remote_addr or ""
     ip_ok, ip_retry = _check_ip_rate(client_ip, is_authenticated=user_id is not None)
     if not ip_ok:
         resp = jsonify(
@@ -157,17 +391,41 @@ def api_submit():
             error="Solutions for %d squares are already known optimal; "
                   "submission not accepted." % n
         ), 422
-    submission_id, err = create_fit_submission(user_id, squares_payload)
+    async_mode = _wants_async()
+    submission_id, err = create_fit_submission(
+        user_id, squares_payload, pre_validate=not async_mode
+    )
     if err:
         return jsonify(error=err), 422
 
-    resp = jsonify(submission_id=submission_id, message="Solution submitted.")
+    if async_mode:
+        status_url = url_for("fit.api_submission_status", submission_id=submission_id)
+        resp = jsonify(
+            submission_id=submission_id,
+            status="pending",
+            status_url=status_url,
+            events_url=url_for("fit.api_submission_events", submission_id=submission_id),
+            message="Solution accepted for validation.",
+        )
+        resp.status_code = 202
+        resp.headers["Location"] = status_url
+        resp.headers["Preference-Applied"] = "respond-async"
+    else:
+        resp = jsonify(submission_id=submission_id, message="Solution submitted.")
     if rate_info is not None:
         rate_info["remaining"] = max(0, rate_info["remaining"] - 1)
         _add_rate_headers(resp, rate_info)
     return resp
 
 
+# Async mode: ?async=1 or "Prefer: respond-async" (RFC 7240)
+def _wants_async():
+    if request.args.get("async") in ("1", "true"):
+        return True
+    prefer = request.headers.get("Prefer", "")
+    return any(p.strip().lower() == "respond-async" for p in prefer.split(","))
+
+
 def _add_rate_headers(resp, rate_info):
     resp.headers["X-RateLimit-Limit"] = str(rate_info["limit"])
     resp.headers["X-RateLimit-Remaining"] = str(rate_info["remaining"])
@@ -0,0 +1,115 @@
+"""Versioned in-memory snapshot of the explorer's square-count catalog.
+
+Merges cases.txt, the known-optimal set (flagged when a reference packing
+exists) and the per-n submission counts from the leaderboard. Requests are
+served from the current snapshot; once it is older than EXPLORE_CATALOG_TTL
+it is rebuilt on a background thread while the stale copy keeps being
+served. A cases.txt edit (new mtime) or a submission turning valid (the
+verify worker's NOTIFY on SUBMISSION_STATUS_CHANNEL) forces a synchronous
+rebuild on the next read.
+"""
+import logging
+import os
+import threading
+import time
+
+from clients.fit.db.fit_cases import build_explore_groups, get_cases_mtime
+from clients.fit.db.submissions import SUBMISSION_STATUS_CHANNEL, get_available_square_counts
+from clients.fit.references import get_reference_library
+from shared.notify import get_listener
+
+EXPLORE_CATALOG_TTL = float(os.environ.get("EXPLORE_CATALOG_TTL", 30))
+
+log = logging.getLogger(__name__)
+
+
+class ExploreCatalog:
+    def __init__(self, version, optimal, found, db_by_n, cases_mtime):
+        self.version = version
+        self.optimal = optimal
+        self.found = found
+        self.db_by_n = db_by_n
+        self.cases_mtime = cases_mtime
+        self.built_at = time.monotonic()
+
+    # Returns (items, has_more) for one chip group
+    def slice(self, group, offset, limit):
+        items = self.optimal if group == "optimal" else self.found
+        return items[offset:offset + limit], len(items) > offset + limit
+
+
+_catalog = None
+_stale = False
+_build_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_watching = False
+
+
+def _build(previous):
+    global _catalog, _stale
+    with _build_lock:
+        # Another thread already replaced the snapshot we found stale
+        if _catalog is not previous and not _stale:
+            return _catalog
+        # Cleared before reading, so a NOTIFY that arrives mid-build marks
+        # the new snapshot stale instead of being lost
+        was_stale, _stale = _stale, False
+        try:
+            from_db = get_available_square_counts()
+            db_by_n = {r["square_count"]: r["submission_count"] for r in from_db}
+            mtime = get_cases_mtime()
+            optimal, found = build_explore_groups(db_by_n)
+            references = get_reference_library()
+        except BaseException:
+            _stale = _stale or was_stale
+            raise
+        for item in optimal:
+            item["reference"] = item["square_count"] in references
+        version = (_catalog.version + 1) if _catalog else 1
+        _catalog = ExploreCatalog(version, optimal, found, db_by_n, mtime)
+        return _catalog
+
+
+def _refresh_in_background(previous):
+    try:
+        _build(previous)
+    except Exception:
+        # Keep serving the stale snapshot; the next read retries
+        log.exception("explore catalog rebuild failed")
+    finally:
+        _refresh_lock.release()
+
+
+def get_explore_catalog():
+    _watch_validations()
+    catalog = _catalog
+    if catalog is None or _stale or catalog.cases_mtime != get_cases_mtime():
+        return _build(catalog)
+    if (time.monotonic() - catalog.built_at > EXPLORE_CATALOG_TTL
+            and _refresh_lock.acquire(blocking=False)):
+        threading.Thread(
+            target=_refresh_in_background, args=(catalog,), daemon=True
+        ).start()
+    return catalog
+
+
+# Forces a rebuild on the next read
+def invalidate_explore_catalog():
+    global _stale
+    _stale = True
+
+
+def _on_status(payload):
+    if payload.get("status") == "valid":
+        invalidate_explore_catalog()
+
+
+# Subscribes this process to validation results once, on first use
+def _watch_validations():
+    global _watching
+    if _watching:
+        return
+    with _build_lock:
+        if not _watching:
+            get_listener(SUBMISSION_STATUS_CHANNEL).add_callback(_on_status)
+            _watching = True
@@ -12,7 +12,26 @@ _OPTIMAL_CAP = 2048
 _FOUND_CAP = 2048
 
 
+_optimal_n = None
+
+
+# Modification time of cases.txt, or None if it is missing
+def get_cases_mtime():
+    try:
+        return os.stat(_CASES_PATH).st_mtime
+    except OSError:
+        return None
+
+
+# Known-optimal square counts; computed once, the inputs are constants
 def get_optimal_n():
+    global _optimal_n
+    if _optimal_n is None:
+        _optimal_n = _compute_optimal_n()
+    return _optimal_n
+
+
+def _compute_optimal_n():
     optimal = set()
     k = 1
     while k * k <= _OPTIMAL_CAP:
@@ -24,7 +43,7 @@ def get_optimal_n():
         optimal.add(k * k - 1)
         optimal.add(k * k - 2)
         k += 1
-    return optimal
+    return frozenset(optimal)
 
 
 def load_found_from_file(path=None):
@@ -0,0 +1,38 @@
+"""Incrementally maintained per-n leaderboard (fit_leaderboard tables).
+
+Writers take the caller's cursor so the leaderboard changes commit in the
+same transaction as the submission status they reflect.
+"""
+
+
+# Adds a newly valid submission; row needs the submissions columns below
+def add_valid_submission(cur, row):
+    if row.get("objective_value") is None:
+        return False
+    cur.execute(
+        """
+        INSERT INTO fit_leaderboard
+            (square_count, objective_value, created_at, submission_id,
+             user_id, min_slack, is_duplicate, duplicate_number)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (submission_id) DO NOTHING
+        RETURNING submission_id
+        """,
+        (row["square_count"], row["objective_value"], row["created_at"],
+         row["id"], row.get("user_id"), row.get("min_slack"),
+         row["is_duplicate"], row.get("duplicate_number")),
+    )
+    if not cur.fetchone():
+        return False
+    unique = 1 if (not row["is_duplicate"] or row.get("duplicate_number") == 1) else 0
+    cur.execute(
+        """
+        INSERT INTO fit_leaderboard_counts (square_count, submission_count, unique_count)
+        VALUES (%s, 1, %s)
+        ON CONFLICT (square_count) DO UPDATE
+        SET submission_count = fit_leaderboard_counts.submission_count + 1,
+            unique_count = fit_leaderboard_counts.unique_count + EXCLUDED.unique_count
+        """,
+        (row["square_count"], unique),
+    )
+    return True
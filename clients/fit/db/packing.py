@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Packed square geometry stored in submissions.squares_packed.
+
+Layout (little-endian, column-major, 64 bytes per square):
+
+    cx[n] cy[n] ux[n] uy[n]            float64
+    cx_q[n] cy_q[n] ux_q[n] uy_q[n]    int64
+
+Columns are read back as memoryview casts over the bytea buffer, so decoding
+does not copy the geometry.
+"""
+import os
+import struct
+import sys
+from collections.abc import Sequence
+
+if __name__ == "__main__":
+    ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))))
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+FLOAT_FIELDS = ("cx", "cy", "ux", "uy")
+INT_FIELDS = ("cx_q", "cy_q", "ux_q", "uy_q")
+BYTES_PER_SQUARE = 8 * (len(FLOAT_FIELDS) + len(INT_FIELDS))
+INT64_MIN = -2**63
+INT64_MAX = 2**63 - 1
+
+_NATIVE_LE = sys.byteorder == "little"
+
+
+def pack_squares(square_data_list):
+    n = len(square_data_list)
+    parts = []
+    for field in FLOAT_FIELDS:
+        parts.append(struct.pack(f"<{n}d", *(sd[field] for sd in square_data_list)))
+    for field in INT_FIELDS:
+        parts.append(struct.pack(f"<{n}q", *(sd[field] for sd in square_data_list)))
+    return b"".join(parts)
+
+
+def _column(view, i, n, fmt):
+    chunk = view[i * 8 * n:(i + 1) * 8 * n]
+    if _NATIVE_LE:
+        return chunk.cast(fmt)
+    return struct.unpack(f"<{n}{fmt}", chunk)
+
+
+class PackedSquares(Sequence):
+    """Read-only view of a packed submission; items are square dicts."""
+
+    def __init__(self, buf, n):
+        view = memoryview(buf)
+        if view.nbytes != n * BYTES_PER_SQUARE:
+            raise ValueError(
+                f"packed squares: expected {n * BYTES_PER_SQUARE} bytes, got {view.nbytes}"
+            )
+        view = view.cast("B")
+        self.n = n
+        self.columns = {}
+        for i, field in enumerate(FLOAT_FIELDS):
+            self.columns[field] = _column(view, i, n, "d")
+        for i, field in enumerate(INT_FIELDS, start=len(FLOAT_FIELDS)):
+            self.columns[field] = _column(view, i, n, "q")
+
+    # View over columns that already exist (e.g. slices of a mapped snapshot)
+    @classmethod
+    def from_columns(cls, columns, n):
+        obj = cls.__new__(cls)
+        obj.n = n
+        obj.columns = columns
+        return obj
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self.n))]
+        if idx < 0:
+            idx += self.n
+        if not 0 <= idx < self.n:
+            raise IndexError(idx)
+        sq = {"idx": idx}
+        for field, col in self.columns.items():
+            sq[field] = col[idx]
+        return sq
+
+
+def unpack_squares(buf, n):
+    return PackedSquares(buf, n)
+
+
+# Float columns only (cx[n] cy[n] ux[n] uy[n], little-endian float64): the
+# compact binary form of the squares API. Packed rows need no re-encoding.
+def pack_float_columns(squares):
+    if isinstance(squares, PackedSquares) and _NATIVE_LE:
+        return b"".join(squares.columns[field].tobytes() for field in FLOAT_FIELDS)
+    n = len(squares)
+    return b"".join(
+        struct.pack(f"<{n}d", *(float(sq[field]) for sq in squares))
+        for field in FLOAT_FIELDS
+    )
+
+
+# Per-field lists of round(value * scale), each delta-encoded against the
+# previous square (first entry absolute)
+def quantized_deltas(squares, scale):
+    out = {}
+    for field in FLOAT_FIELDS:
+        prev = 0
+        deltas = []
+        for sq in squares:
+            q = round(float(sq[field]) * scale)
+            deltas.append(q - prev)
+            prev = q
+        out[field] = deltas
+    return out
+
+
+# Packs legacy submission_squares rows into submissions.squares_packed
+def backfill_packed_squares(batch=100):
+    import psycopg2
+
+    from shared.db import get_cursor
+
+    total = 0
+    while True:
+        with get_cursor() as (conn, cur):
+            cur.execute(
+                """
+                SELECT id FROM submissions
+                WHERE squares_packed IS NULL
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+                """,
+                (batch,),
+            )
+            ids = [row["id"] for row in cur.fetchall()]
+            if not ids:
+                return total
+            for sid in ids:
+                cur.execute(
+                    """
+                    SELECT cx, cy, ux, uy, cx_q, cy_q, ux_q, uy_q
+                    FROM submission_squares
+                    WHERE submission_id = %s
+                    ORDER BY idx
+                    """,
+                    (sid,),
+                )
+                rows = cur.fetchall()
+                cur.execute(
+                    "UPDATE submissions SET squares_packed = %s, square_count = %s "
+                    "WHERE id = %s",
+                    (psycopg2.Binary(pack_squares(rows)), len(rows), sid),
+                )
+            total += len(ids)
+            print(f"  packed {total} submission(s)")
+
+
+if __name__ == "__main__":
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(os.path.join(ROOT, ".env"))
+    except ImportError:
+        pass
+    n = backfill_packed_squares()
+    print(f"Done. Packed {n} submission(s).")
@@ -0,0 +1,19 @@
+"""Lookups on the square_count-partitioned submissions table.
+
+Filtering on square_count as well as id lets Postgres prune to a single
+partition; without it every partition's primary key is probed.
+"""
+
+
+# WHERE clause for a submission by id; square_count prunes to one partition
+def by_id(square_count):
+    if square_count is None:
+        return "id = %s"
+    return "id = %s AND square_count = %s"
+
+
+# Parameters matching by_id(square_count)
+def by_id_params(submission_id, square_count):
+    if square_count is None:
+        return (submission_id,)
+    return (submission_id, square_count)
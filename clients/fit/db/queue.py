@@ -0,0 +1,110 @@
+"""Depth and age of the pending-validation queue, for submit backpressure,
+and how long recent submissions took to reach the leaderboard.
+
+Both queue figures come from the partial pending index: the depth is counted
+only up to QUEUE_COUNT_CAP rows and the age is one MIN() per partition, so
+the query stays cheap however far the verify workers fall behind. Each
+process re-reads them at most every QUEUE_CHECK_SECONDS.
+"""
+import os
+import threading
+import time
+
+import psycopg2
+
+from shared.db import execute_prepared, get_cursor, register_statement
+
+QUEUE_CHECK_SECONDS = float(os.environ.get("QUEUE_CHECK_SECONDS", 2))
+QUEUE_COUNT_CAP = int(os.environ.get("QUEUE_COUNT_CAP", 10_000))
+LATENCY_CHECK_SECONDS = 30
+LATENCY_SAMPLE = 200
+
+register_statement(
+    "fit_queue_stats",
+    """
+    SELECT
+        (SELECT COUNT(*) FROM (
+            SELECT 1 FROM submissions WHERE status = 'pending' LIMIT $1
+        ) p) AS pending,
+        (SELECT EXTRACT(EPOCH FROM NOW() - MIN(created_at))
+         FROM submissions WHERE status = 'pending') AS oldest_age
+    """,
+)
+
+# Seconds from submit to leaderboard listing over the latest listings
+register_statement(
+    "fit_leaderboard_latency",
+    """
+    SELECT COUNT(*) AS samples,
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY waited) AS p50,
+           percentile_cont(0.9) WITHIN GROUP (ORDER BY waited) AS p90,
+           MAX(waited) AS max
+    FROM (
+        SELECT EXTRACT(EPOCH FROM listed_at - created_at) AS waited
+        FROM fit_leaderboard
+        WHERE listed_at IS NOT NULL
+        ORDER BY listed_at DESC
+        LIMIT $1
+    ) recent
+    """,
+)
+
+
+class QueueStats:
+    def __init__(self, pending, oldest_age):
+        self.pending = pending
+        self.oldest_age = oldest_age
+
+
+_stats = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+# Returns QueueStats (oldest_age in seconds, 0 when empty), or None if the
+# database could not be read; callers should then not shed load
+def get_queue_stats():
+    global _stats, _checked_at
+    if time.monotonic() - _checked_at < QUEUE_CHECK_SECONDS:
+        return _stats
+    with _lock:
+        if time.monotonic() - _checked_at < QUEUE_CHECK_SECONDS:
+            return _stats
+        try:
+            with get_cursor(commit=False) as (conn, cur):
+                execute_prepared(cur, "fit_queue_stats", (QUEUE_COUNT_CAP,))
+                row = cur.fetchone()
+            _stats = QueueStats(int(row["pending"]), float(row["oldest_age"] or 0))
+        except psycopg2.Error:
+            _stats = None
+        _checked_at = time.monotonic()
+    return _stats
+
+
+_latency = None
+_latency_checked_at = 0.0
+
+
+# Returns {"samples", "p50", "p90", "max"} in seconds over the last
+# LATENCY_SAMPLE leaderboard listings, or None if it could not be read
+def get_leaderboard_latency():
+    global _latency, _latency_checked_at
+    if time.monotonic() - _latency_checked_at < LATENCY_CHECK_SECONDS:
+        return _latency
+    with _lock:
+        if time.monotonic() - _latency_checked_at < LATENCY_CHECK_SECONDS:
+            return _latency
+        try:
+            with get_cursor(commit=False) as (conn, cur):
+                execute_prepared(cur, "fit_leaderboard_latency", (LATENCY_SAMPLE,))
+                row = cur.fetchone()
+            _latency = {
+                "samples": row["samples"],
+                "p50": None if row["p50"] is None else round(float(row["p50"]), 1),
+                "p90": None if row["p90"] is None else round(float(row["p90"]), 1),
+                "max": None if row["max"] is None else round(float(row["max"]), 1),
+            }
+        except psycopg2.Error:
+            _latency = None
+        _latency_checked_at = time.monotonic()
+    return _latency
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""Columnar, memory-mappable snapshot of all valid Fit packings.
+
+A snapshot is a directory of flat little-endian files, one per column, in
+submission id order:
+
+    meta.json                       format version, row and square totals
+    offsets.i64                     rows + 1 offsets into the square columns
+    id.i64 user_id.i64 square_count.i64 created_at_us.i64 duplicate_number.i64
+    objective_value.f64 min_slack.f64
+    cx.f64 cy.f64 ux.f64 uy.f64     squares of row i: [offsets[i], offsets[i+1])
+    cx_q.i64 cy_q.i64 ux_q.i64 uy_q.i64
+
+NULLs are stored as -1 (integers) or NaN (floats). The writer streams rows
+from a server-side cursor into every column file at once, then swaps the
+finished directory into place, so readers never see a partial snapshot.
+Readers map each file and return memoryview slices, so nothing is copied.
+
+    python -m clients.fit.db.snapshot write PATH
+    python -m clients.fit.db.snapshot check PATH    # re-validate every row
+"""
+import bisect
+import json
+import math
+import mmap
+import os
+import shutil
+import struct
+import sys
+from datetime import datetime, timedelta, timezone
+
+if __name__ == "__main__":
+    ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))))
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+from clients.fit.db.packing import (
+    FLOAT_FIELDS,
+    INT_FIELDS,
+    PackedSquares,
+    unpack_squares,
+)
+
+SNAPSHOT_VERSION = 1
+FIT_SNAPSHOT_PATH = os.environ.get("FIT_SNAPSHOT_PATH", "")
+
+META_INT_FIELDS = ("id", "user_id", "square_count", "created_at_us", "duplicate_number")
+META_FLOAT_FIELDS = ("objective_value", "min_slack")
+
+_NATIVE_LE = sys.byteorder == "little"
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _filename(field, fmt):
+    return f"{field}.{'f64' if fmt == 'd' else 'i64'}"
+
+
+def _columns():
+    cols = [("offsets", "q")]
+    cols += [(f, "q") for f in META_INT_FIELDS]
+    cols += [(f, "d") for f in META_FLOAT_FIELDS]
+    cols += [(f, "d") for f in FLOAT_FIELDS]
+    cols += [(f, "q") for f in INT_FIELDS]
+    return cols
+
+
+def _pack(fmt, values):
+    values = list(values)
+    return struct.pack(f"<{len(values)}{fmt}", *values)
+
+
+def _square_column(squares, field, fmt):
+    if isinstance(squares, PackedSquares) and _NATIVE_LE:
+        return squares.columns[field].tobytes()
+    cast = float if fmt == "d" else int
+    return _pack(fmt, (cast(sq[field]) for sq in squares))
+
+
+def _meta_values(row):
+    created = row["created_at"]
+    return {
+        "id": row["id"],
+        "user_id": -1 if row["user_id"] is None else row["user_id"],
+        "square_count": row["square_count"],
+        "created_at_us": -1 if created is None else (created - _EPOCH) // _MICROSECOND,
+        "duplicate_number": -1 if row["duplicate_number"] is None else row["duplicate_number"],
+        "objective_value": math.nan if row["objective_value"] is None else row["objective_value"],
+        "min_slack": math.nan if row["min_slack"] is None else row["min_slack"],
+    }
+
+
+# Valid submissions in id order with their squares, from a server-side cursor
+def _iter_valid_submissions(itersize=1000):
+    from shared.db import get_cursor
+
+    with get_cursor(commit=False) as (conn, cur):
+        named = conn.cursor(name="fit_snapshot")
+        named.itersize = itersize
+        try:
+            named.execute(
+                """
+                SELECT id, user_id, square_count, objective_value, min_slack,
+                       duplicate_number, created_at, squares_packed
+                FROM submissions
+                WHERE status = 'valid'
+                ORDER BY id
+                """
+            )
+            for row in named:
+                packed = row.pop("squares_packed")
+                if packed is not None:
+                    row["squares"] = unpack_squares(packed, row["square_count"])
+                else:
+                    cur.execute(
+                        """
+                        SELECT cx, cy, ux, uy, cx_q, cy_q, ux_q, uy_q
+                        FROM submission_squares
+                        WHERE submission_id = %s
+                        ORDER BY idx
+                        """,
+                        (row["id"],),
+                    )
+                    row["squares"] = cur.fetchall()
+                yield row
+        finally:
+            named.close()
+
+
+# Writes a snapshot to `path` from `submissions` (dicts with the metadata
+# fields and "squares", ascending id), by default every valid submission
+# in the database; returns the row count
+def write_snapshot(path, submissions=None):
+    if submissions is None:
+        submissions = _iter_valid_submissions()
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    files = {
+        field: open(os.path.join(tmp, _filename(field, fmt)), "wb")
+        for field, fmt in _columns()
+    }
+    rows = squares_total = 0
+    try:
+        files["offsets"].write(_pack("q", [0]))
+        for row in submissions:
+            squares = row["squares"]
+            for field in FLOAT_FIELDS:
+                files[field].write(_square_column(squares, field, "d"))
+            for field in INT_FIELDS:
+                files[field].write(_square_column(squares, field, "q"))
+            meta = _meta_values(row)
+            for field in META_INT_FIELDS:
+                files[field].write(_pack("q", [meta[field]]))
+            for field in META_FLOAT_FIELDS:
+                files[field].write(_pack("d", [meta[field]]))
+            squares_total += len(squares)
+            files["offsets"].write(_pack("q", [squares_total]))
+            rows += 1
+    except BaseException:
+        for f in files.values():
+            f.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    for f in files.values():
+        f.close()
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({
+            "version": SNAPSHOT_VERSION,
+            "rows": rows,
+            "squares": squares_total,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }, f)
+
+    # Swap in the new directory; readers keep their maps of the old files
+    old = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, old)
+    os.rename(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return rows
+
+
+class Snapshot:
+    """Read-only view of a snapshot directory; columns are mapped, not loaded."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {self.meta.get('version')}")
+        self.path = path
+        self.rows = self.meta["rows"]
+        self._maps = []
+        self.columns = {}
+        for field, fmt in _columns():
+            self.columns[field] = self._map(os.path.join(path, _filename(field, fmt)), fmt)
+
+    def _map(self, filename, fmt):
+        with open(filename, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"").cast(fmt)
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mm)
+        if _NATIVE_LE:
+            return memoryview(mm).cast(fmt)
+        n = len(mm) // 8
+        return struct.unpack(f"<{n}{fmt}", mm)
+
+    def __len__(self):
+        return self.rows
+
+    # Row index of a submission id, or None
+    def find(self, submission_id):
+        ids = self.columns["id"]
+        i = bisect.bisect_left(ids, submission_id)
+        if i < self.rows and ids[i] == submission_id:
+            return i
+        return None
+
+    # Squares of row i as a PackedSquares over slices of the mapped columns
+    def squares(self, i):
+        start, end = self.columns["offsets"][i], self.columns["offsets"][i + 1]
+        cols = {
+            field: self.columns[field][start:end]
+            for field in FLOAT_FIELDS + INT_FIELDS
+        }
+        return PackedSquares.from_columns(cols, end - start)
+
+    def row(self, i):
+        out = {field: self.columns[field][i] for field in META_INT_FIELDS + META_FLOAT_FIELDS}
+        for field in ("user_id", "duplicate_number", "created_at_us"):
+            if out[field] == -1:
+                out[field] = None
+        for field in META_FLOAT_FIELDS:
+            if math.isnan(out[field]):
+                out[field] = None
+        return out
+
+    # Row indices with the given square count, in id order
+    def rows_with_count(self, square_count):
+        counts = self.columns["square_count"]
+        return [i for i in range(self.rows) if counts[i] == square_count]
+
+    def close(self):
+        self.columns = {}
+        for mm in self._maps:
+            try:
+                mm.close()
+            except BufferError:
+                pass  # a caller still holds a slice; the map closes with it
+        self._maps = []
+
+
+_snapshot = None
+_snapshot_mtime = None
+
+
+# Snapshot at FIT_SNAPSHOT_PATH, reopened when it is rewritten; None if unset
+def get_snapshot():
+    global _snapshot, _snapshot_mtime
+    if not FIT_SNAPSHOT_PATH:
+        return None
+    try:
+        mtime = os.stat(os.path.join(FIT_SNAPSHOT_PATH, "meta.json")).st_mtime
+    except OSError:
+        return None
+    if _snapshot is None or mtime != _snapshot_mtime:
+        try:
+            _snapshot = Snapshot(FIT_SNAPSHOT_PATH)
+        except (OSError, ValueError):
+            return None
+        _snapshot_mtime = mtime
+    return _snapshot
+
+
+# Re-runs the verifier on every row; returns the ids that no longer validate
+def check_snapshot(snapshot):
+    from clients.fit.verify_worker import validate_submission
+
+    failed = []
+    for i in range(len(snapshot)):
+        valid, _reason, _metrics = validate_submission(snapshot.squares(i))
+        if not valid:
+            failed.append(snapshot.columns["id"][i])
+    return failed
+
+
+if __name__ == "__main__":
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(os.path.join(ROOT, ".env"))
+    except ImportError:
+        pass
+    if len(sys.argv) != 3 or sys.argv[1] not in ("write", "check"):
+        print("usage: python -m clients.fit.db.snapshot write|check PATH")
+        sys.exit(2)
+    if sys.argv[1] == "write":
+        n = write_snapshot(sys.argv[2])
+        print(f"Done. Wrote {n} submission(s) to {sys.argv[2]}.")
+    else:
+        snap = Snapshot(sys.argv[2])
+        failed = check_snapshot(snap)
+        print(f"Checked {len(snap)} submission(s); {len(failed)} failed.")
+        for sid in failed:
+            print(f"  submission {sid}")
+        sys.exit(1 if failed else 0)
@@ -1,10 +1,15 @@
 import hashlib
 import json
 import math
+from datetime import datetime
 
 import psycopg2
 
-from shared.db import get_cursor
+from clients.fit.db.packing import INT64_MAX, INT64_MIN, pack_squares, unpack_squares
+from clients.fit.db.partitions import by_id, by_id_params
+from shared.db import execute_prepared, get_cursor, register_statement
+from shared.pagination import keyset_page
+from shared.rate_limit import record_submission
 
 SQUARE_SIZE = 56
 HALF = SQUARE_SIZE / 2
@@ -15,18 +20,71 @@ ORTHO_TOL = 1e-4
 UNIT_VEC_TOL = 1e-4
 DIAGONAL_TOL = 0.05
 
+# NOTIFY channel the verify worker publishes final statuses on
+SUBMISSION_STATUS_CHANNEL = "fit_submission_status"
+
+# Hot statements on the submit path, prepared once per pooled connection
+register_statement(
+    "fit_instance_lookup",
+    """
+    SELECT id, quant_scale
+    FROM problem_instances
+    WHERE domain = 'square_packing_rotatable'
+    LIMIT 1
+    """,
+)
+# Bumps the counter for one set of equal bounds and returns the new
+# submission's 1-based rank in it; the row lock orders concurrent submits
+register_statement(
+    "fit_duplicate_rank",
+    """
+    INSERT INTO fit_duplicate_counts
+        (instance_id, square_count, objective_value, submission_count)
+    VALUES ($1, $2, $3, 1)
+    ON CONFLICT (instance_id, square_count, objective_value) DO UPDATE
+    SET submission_count = fit_duplicate_counts.submission_count + 1
+    RETURNING submission_count
+    """,
+)
+register_statement(
+    "fit_submission_insert",
+    """
+    INSERT INTO submissions
+        (instance_id, user_id, status, objective_value,
+         solution_hash, square_count, squares_packed, pre_validated)
+    VALUES ($1, $2, 'pending', $3, $4, $5, $6, $7)
+    ON CONFLICT (instance_id, solution_hash, square_count) DO NOTHING
+    RETURNING id
+    """,
+)
+# Only the new row is touched; earlier submissions keep their rank
+register_statement(
+    "fit_submission_set_rank",
+    """
+    UPDATE submissions SET is_duplicate = true, duplicate_number = $1
+    WHERE id = $2 AND square_count = $3
+    """,
+)
+
+
+# Bumps the counter for the submission's bounds and stores its rank on the
+# row (left NULL for the first of a set); returns the 1-based rank
+def assign_duplicate_rank(cur, instance_id, square_count, objective_value, submission_id):
+    execute_prepared(
+        cur, "fit_duplicate_rank", (instance_id, square_count, objective_value)
+    )
+    rank = cur.fetchone()["submission_count"]
+    if rank > 1:
+        execute_prepared(
+            cur, "fit_submission_set_rank", (rank, submission_id, square_count)
+        )
+    return rank
+
 
 # Returns (instance_id, quant_scale), creating the row if needed
 def get_or_create_fit_instance():
     with get_cursor() as (conn, cur):
-        cur.execute(
-            """
-            SELECT id, quant_scale
-            FROM problem_instances
-            WHERE domain = 'square_packing_rotatable'
-            LIMIT 1
-            """
-        )
+        execute_prepared(cur, "fit_instance_lookup")
         row = cur.fetchone()
         if row:
             return row["id"], row["quant_scale"]
@@ -42,7 +100,8 @@ def get_or_create_fit_instance():
         return (row["id"], row["quant_scale"]) if row else (None, None)
 
 
-def _corners_to_cx_cy_ux_uy(corners, quant_scale):
+# Centre and unit vector of one square's corners, as floats and quantized
+def corners_to_cx_cy_ux_uy(corners, quant_scale):
     c0, c1, c2, c3 = corners[0], corners[1], corners[2], corners[3]
     cx = (c0["x"] + c1["x"] + c2["x"] + c3["x"]) / 4
     cy = (c0["y"] + c1["y"] + c2["y"] + c3["y"]) / 4
@@ -197,8 +256,10 @@ def _pre_validate(square_data_list):
     return None
 
 
-# Returns (submission_id, None) or (None, error)
-def create_fit_submission(user_id, squares_payload):
+# Returns (submission_id, None) or (None, error). With pre_validate=False
+# only the payload structure is checked here and the geometry (sides,
+# angles, overlaps) is left to the verify worker.
+def create_fit_submission(user_id, squares_payload, pre_validate=True):
     if not squares_payload:
         return None, "No squares to submit."
     instance_id, quant_scale = get_or_create_fit_instance()
@@ -212,9 +273,10 @@ def create_fit_submission(user_id, squares_payload):
             if not isinstance(pt, dict) or "x" not in pt or "y" not in pt:
                 return None, "Each corner must be {\"x\": number, \"y\": number}."
             try:
-                float(pt["x"])
-                float(pt["y"])
+                finite = math.isfinite(float(pt["x"])) and math.isfinite(float(pt["y"]))
             except (TypeError, ValueError):
+                finite = False
+            if not finite:
                 return None, "Corner coordinates must be numbers."
 
     objective_value = _compute_objective_value(squares_payload)
@@ -222,168 +284,126 @@ def create_fit_submission(user_id, squares_payload):
 
     square_data_list = []
     for idx, corners in enumerate(squares_payload):
-        cx, cy, ux, uy, cx_q, cy_q, ux_q, uy_q = _corners_to_cx_cy_ux_uy(
+        cx, cy, ux, uy, cx_q, cy_q, ux_q, uy_q = corners_to_cx_cy_ux_uy(
             corners, quant_scale
         )
+        # The packed layout stores quantized values as int64
+        if not all(INT64_MIN <= v <= INT64_MAX for v in (cx_q, cy_q, ux_q, uy_q)):
+            return None, "Corner coordinates are out of range."
         square_data_list.append({
             "idx": idx, "cx": cx, "cy": cy, "ux": ux, "uy": uy,
             "cx_q": cx_q, "cy_q": cy_q, "ux_q": ux_q, "uy_q": uy_q,
         })
 
-    validation_err = _pre_validate(square_data_list)
-    if validation_err:
-        return None, validation_err
+    if pre_validate:
+        validation_err = _pre_validate(square_data_list)
+        if validation_err:
+            return None, validation_err
 
     canonical = json.dumps(squares_payload, sort_keys=True)
     solution_hash = hashlib.sha256(canonical.encode()).digest()
     try:
         with get_cursor() as (conn, cur):
-            cur.execute(
-                "SELECT id FROM submissions "
-                "WHERE instance_id = %s AND solution_hash = %s LIMIT 1",
-                (instance_id, psycopg2.Binary(solution_hash)),
-            )
-            if cur.fetchone():
-                return None, "An identical solution has already been submitted."
-
-            cur.execute(
-                """
-                SELECT COUNT(*) AS cnt
-                FROM submissions s
-                LEFT JOIN submission_squares ss ON s.id = ss.submission_id
-                WHERE s.instance_id = %s
-                  AND s.objective_value = %s
-                GROUP BY s.id
-                HAVING COUNT(ss.idx) = %s
-                """,
-                (instance_id, objective_value, n_squares),
-            )
-            existing_count = len(cur.fetchall())
-            is_duplicate = existing_count > 0
-            duplicate_number = existing_count + 1 if is_duplicate else None
-
-            cur.execute(
-                """
-                INSERT INTO submissions
-                    (instance_id, user_id, status, objective_value,
-                     solution_hash, is_duplicate, duplicate_number)
-                VALUES (%s, %s, 'pending', %s, %s, %s, %s)
-                RETURNING id
-                """,
+            # The unique hash index rejects identical solutions, even from
+            # concurrent requests, before anything else is written
+            execute_prepared(
+                cur, "fit_submission_insert",
                 (instance_id, user_id, objective_value,
                  psycopg2.Binary(solution_hash),
-                 is_duplicate, duplicate_number),
+                 n_squares, psycopg2.Binary(pack_squares(square_data_list)),
+                 pre_validate),
             )
             row = cur.fetchone()
             if not row:
-                return None, "Failed to create submission."
+                return None, "An identical solution has already been submitted."
             submission_id = row["id"]
 
-            if is_duplicate and existing_count == 1:
-                cur.execute(
-                    """
-                    UPDATE submissions SET is_duplicate = true, duplicate_number = 1
-                    WHERE id = (
-                        SELECT s.id FROM submissions s
-                        LEFT JOIN submission_squares ss ON s.id = ss.submission_id
-                        WHERE s.instance_id = %s
-                          AND s.objective_value = %s
-                          AND s.is_duplicate = false
-                          AND s.id != %s
-                        GROUP BY s.id
-                        HAVING COUNT(ss.idx) = %s
-                        ORDER BY s.created_at ASC
-                        LIMIT 1
-                    )
-                    """,
-                    (instance_id, objective_value, submission_id, n_squares),
-                )
-
-            for sd in square_data_list:
-                cur.execute(
-                    """
-                    INSERT INTO submission_squares
-                    (submission_id, idx, cx, cy, ux, uy, cx_q, cy_q, ux_q, uy_q, pinned)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, false)
-                    """,
-                    (submission_id, sd["idx"], sd["cx"], sd["cy"],
-                     sd["ux"], sd["uy"], sd["cx_q"], sd["cy_q"],
-                     sd["ux_q"], sd["uy_q"]),
+            # Unchecked (async) submissions take a rank only once the verify
+            # worker finds them valid, so an invalid one never outranks it
+            if pre_validate:
+                assign_duplicate_rank(
+                    cur, instance_id, n_squares, objective_value, submission_id
                 )
+            record_submission(cur, user_id)
             return submission_id, None
     except psycopg2.Error as e:
         return None, str(e)
 
 
+# Explorer reads below come from the fit_leaderboard tables (see leaderboard.py)
 def get_available_square_counts():
     with get_cursor() as (conn, cur):
         cur.execute(
             """
-            SELECT COUNT(ss.idx) AS square_count,
-                   COUNT(DISTINCT s.id) AS submission_count
-            FROM submissions s
-            JOIN problem_instances pi ON s.instance_id = pi.id
-            LEFT JOIN submission_squares ss ON s.id = ss.submission_id
-            WHERE pi.domain = 'square_packing_rotatable'
-              AND s.status = 'valid'
-            GROUP BY s.id
+            SELECT square_count, submission_count
+            FROM fit_leaderboard_counts
+            WHERE submission_count > 0
+            ORDER BY square_count
             """
         )
-        rows = cur.fetchall()
-        counts = {}
-        for r in rows:
-            n = r["square_count"]
-            counts[n] = counts.get(n, 0) + 1
-        return sorted(
-            [{"square_count": k, "submission_count": v} for k, v in counts.items()],
-            key=lambda x: x["square_count"],
-        )
+        return cur.fetchall()
+
+
+def _explore_key(row):
+    return [row["objective_value"], row["created_at"].isoformat(), row["id"]]
 
 
-def get_best_submissions(square_count, page=1, per_page=50, hide_duplicates=False):
-    offset = (page - 1) * per_page
-    dup_filter = "AND (s.is_duplicate = false OR s.duplicate_number = 1)" if hide_duplicates else ""
+# Validated (objective_value, created_at, id) from a page cursor, or None
+def _explore_cursor_key(cursor):
+    if not cursor or len(cursor["k"]) != 3:
+        return None
+    obj, created_at, sid = cursor["k"]
+    if not isinstance(obj, (int, float)) or not isinstance(sid, int):
+        return None
+    try:
+        return obj, datetime.fromisoformat(created_at), sid
+    except (TypeError, ValueError):
+        return None
+
+
+# Keyset-paginated on (objective_value, created_at, id); returns (rows, page_info)
+def get_best_submissions(square_count, per_page=50, hide_duplicates=False, cursor=None):
+    dup_filter = "AND (is_duplicate = false OR duplicate_number = 1)" if hide_duplicates else ""
+    count_col = "unique_count" if hide_duplicates else "submission_count"
+    cursor_key = _explore_cursor_key(cursor)
+    if cursor_key is None:
+        cursor = None
+
+    key_filter = ""
+    order = "ASC"
+    params = [square_count]
+    if cursor:
+        backward = bool(cursor.get("b"))
+        key_filter = (
+            "AND (objective_value, created_at, submission_id) "
+            + ("< (%s, %s, %s)" if backward else "> (%s, %s, %s)")
+        )
+        order = "DESC" if backward else "ASC"
+        params.extend(cursor_key)
+    params.append(per_page + 1)
 
     with get_cursor() as (conn, cur):
         cur.execute(
-            f"""
-            SELECT COUNT(*) AS cnt
-            FROM (
-                SELECT s.id
-                FROM submissions s
-                JOIN problem_instances pi ON s.instance_id = pi.id
-                LEFT JOIN submission_squares ss ON s.id = ss.submission_id
-                WHERE pi.domain = 'square_packing_rotatable'
-                  AND s.status = 'valid'
-                  {dup_filter}
-                GROUP BY s.id
-                HAVING COUNT(ss.idx) = %s
-            ) sub
-            """,
+            f"SELECT {count_col} AS cnt FROM fit_leaderboard_counts WHERE square_count = %s",
             (square_count,),
         )
-        total = cur.fetchone()["cnt"]
+        row = cur.fetchone()
+        total = row["cnt"] if row else 0
 
         cur.execute(
             f"""
-            SELECT s.id, s.user_id, s.status, s.objective_value, s.min_slack,
-                   s.created_at, s.is_duplicate, s.duplicate_number,
-                   COUNT(ss.idx) AS square_count
-            FROM submissions s
-            JOIN problem_instances pi ON s.instance_id = pi.id
-            LEFT JOIN submission_squares ss ON s.id = ss.submission_id
-            WHERE pi.domain = 'square_packing_rotatable'
-              AND s.status = 'valid'
+            SELECT submission_id AS id, user_id, 'valid' AS status, objective_value,
+                   min_slack, created_at, is_duplicate, duplicate_number, square_count
+            FROM fit_leaderboard
+            WHERE square_count = %s
               {dup_filter}
-            GROUP BY s.id, s.user_id, s.status, s.objective_value, s.min_slack,
-                     s.created_at, s.is_duplicate, s.duplicate_number
-            HAVING COUNT(ss.idx) = %s
-            ORDER BY s.objective_value ASC NULLS LAST, s.created_at ASC
-            LIMIT %s OFFSET %s
+              {key_filter}
+            ORDER BY objective_value {order}, created_at {order}, submission_id {order}
+            LIMIT %s
             """,
-            (square_count, per_page, offset),
+            params,
         )
-        return cur.fetchall(), total
+        return keyset_page(cur.fetchall(), per_page, cursor, _explore_key, total)
 
 
 # IDs of top N valid submissions with distinct bounds (for medals)
@@ -391,16 +411,11 @@ def get_top_valid_ids(square_count, limit=3):
     with get_cursor() as (conn, cur):
         cur.execute(
             """
-            SELECT DISTINCT ON (s.objective_value) s.id
-            FROM submissions s
-            JOIN problem_instances pi ON s.instance_id = pi.id
-            LEFT JOIN submission_squares ss ON s.id = ss.submission_id
-            WHERE pi.domain = 'square_packing_rotatable'
-              AND s.status = 'valid'
-              AND (s.is_duplicate = false OR s.duplicate_number = 1)
-            GROUP BY s.id, s.objective_value, s.created_at
-            HAVING COUNT(ss.idx) = %s
-            ORDER BY s.objective_value ASC NULLS LAST, s.created_at ASC
+            SELECT DISTINCT ON (objective_value) submission_id AS id
+            FROM fit_leaderboard
+            WHERE square_count = %s
+              AND (is_duplicate = false OR duplicate_number = 1)
+            ORDER BY objective_value ASC, created_at ASC, submission_id ASC
             LIMIT %s
             """,
             (square_count, limit),
@@ -408,8 +423,59 @@ def get_top_valid_ids(square_count, limit=3):
         return [row["id"] for row in cur.fetchall()]
 
 
-def get_submission_squares(submission_id):
+# Public status of a submission, as served by the status API and pushed by
+# the verify worker; `reason` is the latest validation message, if any
+def status_payload(row, reason=None):
+    return {
+        "id": row["id"],
+        "status": row["status"],
+        "square_count": row["square_count"],
+        "objective_value": row["objective_value"],
+        "duplicate_number": row["duplicate_number"],
+        "reason": reason,
+    }
+
+
+# Returns status_payload() for a submission, or None if the id is unknown
+def get_submission_status(submission_id):
     with get_cursor() as (conn, cur):
+        cur.execute(
+            """
+            SELECT s.id, s.status, s.square_count, s.objective_value, s.duplicate_number,
+                   (SELECT reason FROM validation_runs
+                    WHERE submission_id = s.id
+                    ORDER BY created_at DESC
+                    LIMIT 1) AS reason
+            FROM submissions s
+            WHERE s.id = %s
+            """,
+            (submission_id,),
+        )
+        row = cur.fetchone()
+        return status_payload(row, row["reason"]) if row else None
+
+
+# Sequence of square dicts; packed submissions decode without a row per square
+def get_submission_squares(submission_id, square_count=None):
+    geometry = get_submission_geometry(submission_id, square_count)
+    return geometry["squares"] if geometry else []
+
+
+# Returns {"status", "square_count", "squares"} or None if the id is unknown
+def get_submission_geometry(submission_id, square_count=None):
+    with get_cursor() as (conn, cur):
+        cur.execute(
+            f"SELECT status, square_count, squares_packed FROM submissions "
+            f"WHERE {by_id(square_count)}",
+            by_id_params(submission_id, square_count),
+        )
+        row = cur.fetchone()
+        if not row:
+            return None
+        geometry = {"status": row["status"], "square_count": row["square_count"]}
+        if row["squares_packed"] is not None:
+            geometry["squares"] = unpack_squares(row["squares_packed"], row["square_count"])
+            return geometry
         cur.execute(
             """
             SELECT idx, cx, cy, ux, uy
@@ -419,4 +485,88 @@ def get_submission_squares(submission_id):
             """,
             (submission_id,),
         )
-        return cur.fetchall()
+        geometry["squares"] = cur.fetchall()
+        return geometry
+
+
+# Returns {id: {"status", "square_count", "squares"}} for the ids that exist,
+# in one query (plus one for any legacy rows); square_count prunes partitions
+def get_submissions_geometry(submission_ids, square_count=None):
+    ids = list(submission_ids)
+    if not ids:
+        return {}
+    where = "id = ANY(%s)"
+    params = [ids]
+    if square_count is not None:
+        where += " AND square_count = %s"
+        params.append(square_count)
+    result = {}
+    with get_cursor() as (conn, cur):
+        cur.execute(
+            f"SELECT id, status, square_count, squares_packed FROM submissions "
+            f"WHERE {where}",
+            params,
+        )
+        legacy = []
+        for row in cur.fetchall():
+            geometry = {"status": row["status"], "square_count": row["square_count"]}
+            if row["squares_packed"] is not None:
+                geometry["squares"] = unpack_squares(
+                    row["squares_packed"], row["square_count"]
+                )
+            else:
+                geometry["squares"] = []
+                legacy.append(row["id"])
+            result[row["id"]] = geometry
+        if legacy:
+            cur.execute(
+                """
+                SELECT submission_id, idx, cx, cy, ux, uy
+                FROM submission_squares
+                WHERE submission_id = ANY(%s)
+                ORDER BY submission_id, idx
+                """,
+                (legacy,),
+            )
+            for row in cur.fetchall():
+                result[row["submission_id"]]["squares"].append(row)
+    return result
+
+
+_EXPORT_SQL = """
+    SELECT id, user_id, status, objective_value, min_slack,
+           is_duplicate, duplicate_number, created_at,
+           square_count, squares_packed
+    FROM submissions
+    WHERE square_count = %s AND status = %s AND id > %s
+    ORDER BY id
+"""
+
+
+# Streams submissions of one square count in id order through a server-side
+# cursor, so memory stays constant however many rows match. Yields dicts
+# with "squares"; the connection is held until the generator is closed.
+def iter_submissions_for_export(square_count, status, after_id=0, itersize=500):
+    with get_cursor(commit=False) as (conn, cur):
+        named = conn.cursor(name="fit_export")
+        named.itersize = itersize
+        try:
+            named.execute(_EXPORT_SQL, (square_count, status, after_id))
+            for row in named:
+                packed = row.pop("squares_packed")
+                if packed is not None:
+                    row["squares"] = unpack_squares(packed, row["square_count"])
+                else:
+                    cur.execute(
+                        """
+                        SELECT idx, cx, cy, ux, uy
+                        FROM submission_squares
+                        WHERE submission_id = %s
+                        ORDER BY idx
+                        """,
+                        (row["id"],),
+                    )
+                    row["squares"] = cur.fetchall()
+                yield row
+        finally:
+            named.close()
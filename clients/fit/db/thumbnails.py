@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""SVG thumbnails of valid packings, rendered once by the verify worker.
+
+The drawing matches the explorer's client-side renderer: the squares inside
+their bounding square, padded by 8% and scaled to a fixed viewBox.
+Coordinates are rounded to one decimal, which is below a pixel at any size
+the explorer shows.
+"""
+import math
+import os
+import sys
+
+if __name__ == "__main__":
+    ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))))
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+from shared.db import get_cursor
+
+THUMBNAIL_SIZE = 400
+HALF = 56 / 2
+PADDING = 0.08
+
+
+def _corners(sq):
+    cx, cy = float(sq["cx"]), float(sq["cy"])
+    ux, uy = float(sq["ux"]), float(sq["uy"])
+    d = HALF * math.sqrt(2)
+    return (
+        (cx + d * ux, cy + d * uy),
+        (cx - d * uy, cy + d * ux),
+        (cx - d * ux, cy - d * uy),
+        (cx + d * uy, cy - d * ux),
+    )
+
+
+def _num(v):
+    return f"{v:.1f}".rstrip("0").rstrip(".")
+
+
+def render_thumbnail_svg(squares, size=THUMBNAIL_SIZE):
+    polys = [_corners(sq) for sq in squares]
+    if not polys:
+        return None
+    xs = [x for poly in polys for x, _ in poly]
+    ys = [y for poly in polys for _, y in poly]
+    side = max(max(xs) - min(xs), max(ys) - min(ys))
+    x0 = (min(xs) + max(xs)) / 2 - side / 2
+    y0 = (min(ys) + max(ys)) / 2 - side / 2
+    pad = side * PADDING
+    scale = size / (side + 2 * pad)
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+        f'width="{size}" height="{size}" class="solution-svg">',
+        f'<rect width="{size}" height="{size}" fill="#ffffff"/>',
+        f'<rect x="{_num(pad * scale)}" y="{_num(pad * scale)}" '
+        f'width="{_num(side * scale)}" height="{_num(side * scale)}" '
+        f'fill="none" stroke="#000000" stroke-width="1"/>',
+        '<g fill="rgba(180, 180, 180, 0.55)" stroke="#000000" stroke-width="0.75">',
+    ]
+    for poly in polys:
+        points = " ".join(
+            f"{_num((x - x0 + pad) * scale)},{_num((y - y0 + pad) * scale)}"
+            for x, y in poly
+        )
+        parts.append(f'<polygon points="{points}"/>')
+    parts.append("</g></svg>")
+    return "".join(parts)
+
+
+# Stores the thumbnail with the caller's cursor (same transaction as validation)
+def store_thumbnail(cur, submission_id, squares):
+    svg = render_thumbnail_svg(squares)
+    if svg is None:
+        return
+    cur.execute(
+        """
+        INSERT INTO submission_thumbnails (submission_id, svg)
+        VALUES (%s, %s)
+        ON CONFLICT (submission_id) DO NOTHING
+        """,
+        (submission_id, svg),
+    )
+
+
+# Returns the SVG text, or None if the submission has no thumbnail (yet)
+def get_thumbnail(submission_id):
+    with get_cursor(commit=False) as (conn, cur):
+        cur.execute(
+            "SELECT svg FROM submission_thumbnails WHERE submission_id = %s",
+            (submission_id,),
+        )
+        row = cur.fetchone()
+        return row["svg"] if row else None
+
+
+# Renders thumbnails for valid submissions validated before thumbnails existed
+def backfill_thumbnails(batch=100):
+    from clients.fit.db.submissions import get_submission_geometry
+
+    total = 0
+    last_id = 0
+    while True:
+        with get_cursor(commit=False) as (conn, cur):
+            cur.execute(
+                """
+                SELECT l.submission_id, l.square_count
+                FROM fit_leaderboard l
+                LEFT JOIN submission_thumbnails t ON t.submission_id = l.submission_id
+                WHERE t.submission_id IS NULL AND l.submission_id > %s
+                ORDER BY l.submission_id
+                LIMIT %s
+                """,
+                (last_id, batch),
+            )
+            rows = cur.fetchall()
+        if not rows:
+            return total
+        for row in rows:
+            geometry = get_submission_geometry(row["submission_id"], row["square_count"])
+            if geometry and geometry["squares"]:
+                with get_cursor() as (conn, cur):
+                    store_thumbnail(cur, row["submission_id"], geometry["squares"])
+                total += 1
+        last_id = rows[-1]["submission_id"]
+
+
+if __name__ == "__main__":
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(os.path.join(ROOT, ".env"))
+    except ImportError:
+        pass
+    n = backfill_thumbnails()
+    print(f"Done. Rendered {n} thumbnail(s).")
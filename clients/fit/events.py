@@ -0,0 +1,103 @@
+"""Submission status: /api/fit/submission/<id>/status and .../events.
+
+`status` is a plain JSON read. `events` is a server-sent-events stream: it
+sends the current status at once and, while the submission is pending, waits
+for the verify worker's NOTIFY (shared/notify.py) and sends the final
+valid/invalid status, then ends. A NOTIFY can be missed (the listener is
+still connecting, or reconnecting), so every keepalive tick also re-reads
+the row; waiting otherwise holds no DB connection. A stream gives up after
+EVENTS_TIMEOUT_SECONDS and the browser's EventSource simply reconnects.
+
+Each open stream occupies one server thread: the web service runs gunicorn
+with threaded workers and a worker timeout above the stream lifetime (see
+extsearch-web.service), and EVENTS_MAX_STREAMS per process stays below the
+thread count so ordinary requests are still served.
+"""
+import json
+import os
+import threading
+import time
+
+from flask import Response, jsonify
+
+from clients.fit import fit_bp
+from clients.fit.db.submissions import SUBMISSION_STATUS_CHANNEL, get_submission_status
+from shared.notify import get_listener
+
+EVENTS_TIMEOUT_SECONDS = float(os.environ.get("EVENTS_TIMEOUT_SECONDS", 120))
+EVENTS_KEEPALIVE_SECONDS = float(os.environ.get("EVENTS_KEEPALIVE_SECONDS", 15))
+EVENTS_MAX_STREAMS = int(os.environ.get("EVENTS_MAX_STREAMS", 8))
+EVENTS_RETRY_MS = 5000
+
+FINAL_STATUSES = frozenset({"valid", "invalid"})
+
+_streams = threading.BoundedSemaphore(EVENTS_MAX_STREAMS)
+
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+def _status_events(submission_id, status, sub):
+    yield f"retry: {EVENTS_RETRY_MS}\n"
+    yield _sse("status", status)
+    if status["status"] in FINAL_STATUSES:
+        return
+    deadline = time.monotonic() + EVENTS_TIMEOUT_SECONDS
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        payload = sub.wait(min(EVENTS_KEEPALIVE_SECONDS, remaining))
+        if payload is None:
+            # Covers a NOTIFY sent before LISTEN ran or while reconnecting
+            payload = get_submission_status(submission_id)
+        if payload is not None and payload["status"] in FINAL_STATUSES:
+            yield _sse("status", payload)
+            return
+        yield ": keepalive\n\n"
+
+
+@fit_bp.route("/api/fit/submission/<int:submission_id>/status")
+def api_submission_status(submission_id):
+    status = get_submission_status(submission_id)
+    if status is None:
+        return jsonify(error="Submission not found."), 404
+    resp = jsonify(status)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+@fit_bp.route("/api/fit/submission/<int:submission_id>/events")
+def api_submission_events(submission_id):
+    if not _streams.acquire(blocking=False):
+        resp = jsonify(error="Too many open event streams. Poll the status URL instead.")
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "10"
+        return resp
+
+    # Subscribe before reading, so a result committed in between is not missed
+    listener = get_listener(SUBMISSION_STATUS_CHANNEL)
+    sub = listener.subscribe(submission_id)
+
+    def close():
+        listener.unsubscribe(submission_id, sub)
+        _streams.release()
+
+    try:
+        status = get_submission_status(submission_id)
+    except BaseException:
+        close()
+        raise
+    if status is None:
+        close()
+        return jsonify(error="Submission not found."), 404
+
+    resp = Response(
+        _status_events(submission_id, status, sub),
+        mimetype="text/event-stream",
+    )
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    resp.call_on_close(close)
+    return resp
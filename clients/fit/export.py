@@ -0,0 +1,180 @@
+"""Bulk export of Fit submissions: /api/fit/export?n=<square count>.
+
+Every submission of one square count is streamed in id order as NDJSON (one
+submission per line) or CSV (one square per row). Each record carries a
+`cursor` token; passing it back as ?cursor= resumes right after that
+submission. Streams are throttled to EXPORT_BYTES_PER_SECOND each, and only
+EXPORT_MAX_STREAMS run at once per process, since each holds a DB connection.
+Each client (signed-in user, else IP) also has a byte budget of
+EXPORT_CLIENT_BYTES_PER_HOUR across all workers; a stream that exhausts it
+stops at a record boundary, and the client resumes later from the last
+cursor it received.
+"""
+import csv
+import io
+import json
+import math
+import os
+import threading
+import time
+
+from flask import Response, jsonify, request, session, stream_with_context
+
+from clients.fit import fit_bp
+from clients.fit.db.submissions import iter_submissions_for_export
+from shared.ip_limiter import SharedRateLimiter
+from shared.pagination import decode_cursor, encode_cursor
+
+EXPORT_BYTES_PER_SECOND = int(os.environ.get("EXPORT_BYTES_PER_SECOND", 512 * 1024))
+EXPORT_MAX_STREAMS = int(os.environ.get("EXPORT_MAX_STREAMS", 2))
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_CLIENT_BYTES_PER_HOUR = int(
+    os.environ.get("EXPORT_CLIENT_BYTES_PER_HOUR", 256 * 1024 * 1024)
+)
+EXPORT_STATUSES = ("valid", "invalid", "pending")
+
+CSV_COLUMNS = (
+    "submission_id", "status", "objective_value", "created_at",
+    "idx", "cx", "cy", "ux", "uy", "cursor",
+)
+
+_streams = threading.BoundedSemaphore(EXPORT_MAX_STREAMS)
+# Counted in KiB so an hour's budget fits the limiter's 32-bit counters
+_budget = SharedRateLimiter("fit-export-kib", 3600)
+_BUDGET_KIB = EXPORT_CLIENT_BYTES_PER_HOUR // 1024
+
+
+def _client_key():
+    user_id = session.get("user_id")
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{request.remote_addr or ''}"
+
+
+def _budget_response(retry):
+    resp = jsonify(error="Export bandwidth limit reached. Try again in %d seconds." % retry)
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(retry)
+    return resp
+
+
+def _record(row):
+    return {
+        "id": row["id"],
+        "square_count": row["square_count"],
+        "status": row["status"],
+        "objective_value": row["objective_value"],
+        "min_slack": row["min_slack"],
+        "is_duplicate": row["is_duplicate"],
+        "duplicate_number": row["duplicate_number"],
+        "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+        "squares": [
+            [float(sq["cx"]), float(sq["cy"]), float(sq["ux"]), float(sq["uy"])]
+            for sq in row["squares"]
+        ],
+    }
+
+
+def _ndjson_lines(rows, token):
+    for row in rows:
+        record = _record(row)
+        record["cursor"] = token(row)
+        yield json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def _csv_lines(rows, token):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        created = row["created_at"].isoformat() if row["created_at"] else ""
+        cursor = token(row)
+        for i, sq in enumerate(row["squares"]):
+            writer.writerow((
+                row["id"], row["status"], row["objective_value"], created,
+                i, float(sq["cx"]), float(sq["cy"]), float(sq["ux"]), float(sq["uy"]),
+                cursor,
+            ))
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+# Groups lines into chunks and sleeps as needed to stay under bytes_per_second;
+# stops early once charge(nbytes) refuses a chunk
+def _throttled(lines, bytes_per_second, charge=None):
+    started = time.monotonic()
+    sent = 0
+    chunk = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size < EXPORT_CHUNK_BYTES:
+            continue
+        data = "".join(chunk).encode()
+        chunk, size = [], 0
+        if charge is not None and not charge(len(data)):
+            return
+        sent += len(data)
+        ahead = sent / bytes_per_second - (time.monotonic() - started)
+        if ahead > 0:
+            time.sleep(ahead)
+        yield data
+    if chunk:
+        data = "".join(chunk).encode()
+        if charge is None or charge(len(data)):
+            yield data
+
+
+@fit_bp.route("/api/fit/export")
+def api_fit_export():
+    square_count = request.args.get("n", type=int)
+    if square_count is None:
+        return jsonify(error="n (square count) is required"), 400
+    status = request.args.get("status", "valid")
+    if status not in EXPORT_STATUSES:
+        return jsonify(error="status must be one of: " + ", ".join(EXPORT_STATUSES)), 400
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        return jsonify(error="format must be ndjson or csv"), 400
+
+    after_id = 0
+    token = request.args.get("cursor")
+    if token:
+        cursor = decode_cursor(token)
+        key = cursor["k"] if cursor else None
+        if (not key or not isinstance(key[0], int)
+                or cursor.get("n") != square_count or cursor.get("s") != status):
+            return jsonify(error="Invalid cursor for this export."), 400
+        after_id = key[0]
+
+    client = _client_key()
+    budget_ok, budget_retry = _budget.hit(client, _BUDGET_KIB, cost=0)
+    if not budget_ok:
+        return _budget_response(budget_retry)
+
+    if not _streams.acquire(blocking=False):
+        resp = jsonify(error="Too many exports in progress. Try again shortly.")
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "30"
+        return resp
+
+    def make_token(row):
+        return encode_cursor({"k": [row["id"]], "n": square_count, "s": status})
+
+    rows = iter_submissions_for_export(square_count, status, after_id)
+    lines = (_csv_lines if fmt == "csv" else _ndjson_lines)(rows, make_token)
+    def charge(nbytes):
+        return _budget.hit(client, _BUDGET_KIB, cost=math.ceil(nbytes / 1024))[0]
+
+    body = stream_with_context(_throttled(lines, EXPORT_BYTES_PER_SECOND, charge))
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    resp = Response(body, mimetype=mimetype)
+    resp.headers["Content-Disposition"] = (
+        f'attachment; filename="fit-{square_count}-{status}.{fmt}"'
+    )
+    resp.headers["X-Accel-Buffering"] = "no"
+    # Released when the response is closed, even if streaming never started
+    resp.call_on_close(_streams.release)
+    return resp
@@ -0,0 +1,100 @@
+"""Reference packings (proven optimal or best known) from data/packings/*.json.
+
+Each file holds {"n", "squares": [[corner, corner, corner, corner], ...],
+"source"}. They are compiled once into packed geometry (the same layout as
+submissions.squares_packed) and kept in memory by n. The directory is
+re-scanned at most every REFERENCE_CHECK_SECONDS, so files added or edited
+later are picked up without a restart.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from clients.fit.db.packing import pack_squares, unpack_squares
+from clients.fit.db.submissions import QUANT_SCALE, corners_to_cx_cy_ux_uy
+
+PACKINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "packings")
+REFERENCE_CHECK_SECONDS = float(os.environ.get("REFERENCE_CHECK_SECONDS", 30))
+
+log = logging.getLogger(__name__)
+
+
+class ReferencePacking:
+    def __init__(self, n, source, packed, digest):
+        self.n = n
+        self.source = source
+        self.packed = packed
+        self.digest = digest
+
+    @property
+    def squares(self):
+        return unpack_squares(self.packed, self.n)
+
+
+def _square_from_corners(corners):
+    if not isinstance(corners, list) or len(corners) != 4:
+        raise ValueError("each square must have exactly 4 corners")
+    cx, cy, ux, uy, cx_q, cy_q, ux_q, uy_q = corners_to_cx_cy_ux_uy(corners, QUANT_SCALE)
+    return {
+        "cx": cx, "cy": cy, "ux": ux, "uy": uy,
+        "cx_q": cx_q, "cy_q": cy_q, "ux_q": ux_q, "uy_q": uy_q,
+    }
+
+
+def _compile(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    data = json.loads(raw)
+    squares = [_square_from_corners(corners) for corners in data["squares"]]
+    n = int(data.get("n", len(squares)))
+    if n != len(squares):
+        raise ValueError(f"{path}: n={n} but {len(squares)} squares")
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    return ReferencePacking(n, data.get("source"), pack_squares(squares), digest)
+
+
+def _listing():
+    try:
+        entries = os.scandir(PACKINGS_DIR)
+    except OSError:
+        return ()
+    with entries:
+        return tuple(sorted(
+            (e.name, e.stat().st_mtime) for e in entries if e.name.endswith(".json")
+        ))
+
+
+_library = {}
+_library_listing = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+# Returns {n: ReferencePacking}; files that fail to parse are skipped
+def get_reference_library():
+    global _library, _library_listing, _checked_at
+    if time.monotonic() - _checked_at < REFERENCE_CHECK_SECONDS:
+        return _library
+    with _lock:
+        if time.monotonic() - _checked_at < REFERENCE_CHECK_SECONDS:
+            return _library
+        listing = _listing()
+        if listing != _library_listing:
+            library = {}
+            for name, _mtime in listing:
+                try:
+                    ref = _compile(os.path.join(PACKINGS_DIR, name))
+                except (OSError, ValueError, KeyError, TypeError, IndexError) as exc:
+                    log.warning("skipping reference packing %s: %s", name, exc)
+                    continue
+                library[ref.n] = ref
+            _library, _library_listing = library, listing
+        _checked_at = time.monotonic()
+    return _library
+
+
+def get_reference(n):
+    return get_reference_library().get(n)
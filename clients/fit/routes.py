@@ -3,12 +3,10 @@ import re
 from flask import redirect, render_template, request, url_for
 
 from clients.fit import fit_bp
-from clients.fit.db.fit_cases import build_explore_groups, get_optimal_n
-from clients.fit.db.submissions import (
-    get_available_square_counts,
-    get_best_submissions,
-    get_top_valid_ids,
-)
+from clients.fit.db.catalog import get_explore_catalog
+from clients.fit.db.fit_cases import get_optimal_n
+from clients.fit.db.submissions import get_best_submissions, get_top_valid_ids
+from shared.pagination import decode_cursor
 from shared.users import enrich_submissions_with_usernames
 
 CHIP_BATCH = 50
@@ -64,33 +62,37 @@ def what_is_fit():
 
 @fit_bp.route("/fit/explore")
 def explore_solutions():
-    from_db = get_available_square_counts()
-    db_by_n = {r["square_count"]: r["submission_count"] for r in from_db}
-    optimal_counts, found_counts = build_explore_groups(db_by_n)
+    catalog = get_explore_catalog()
+    optimal_counts, optimal_has_more = catalog.slice("optimal", 0, CHIP_BATCH)
+    found_counts, found_has_more = catalog.slice("found", 0, CHIP_BATCH)
     n = request.args.get("n", type=int)
-    page = request.args.get("page", 1, type=int)
+    cursor = decode_cursor(request.args.get("cursor"))
     hide_duplicates = request.args.get("hide_duplicates", "1") == "1"
     per_page = 50
     submissions_list = []
     total = 0
     total_pages = 1
+    page_info = {"page": 1, "has_prev": False, "next": None, "prev": None}
     medal_ids = []
     if n is not None:
-        submissions_list, total = get_best_submissions(
-            n, page=page, per_page=per_page, hide_duplicates=hide_duplicates,
+        submissions_list, page_info = get_best_submissions(
+            n, per_page=per_page, hide_duplicates=hide_duplicates, cursor=cursor,
         )
         enrich_submissions_with_usernames(submissions_list)
+        total = page_info["total"]
         total_pages = max(1, (total + per_page - 1) // per_page)
         medal_ids = get_top_valid_ids(n, limit=3)
     return render_template(
         "fit/explore.html",
-        optimal_counts=optimal_counts[:CHIP_BATCH],
-        found_counts=found_counts[:CHIP_BATCH],
-        optimal_has_more=len(optimal_counts) > CHIP_BATCH,
-        found_has_more=len(found_counts) > CHIP_BATCH,
+        optimal_counts=optimal_counts,
+        found_counts=found_counts,
+        optimal_has_more=optimal_has_more,
+        found_has_more=found_has_more,
         selected_n=n,
         submissions=submissions_list,
-        page=page,
+        page=page_info["page"],
+        page_info=page_info,
+        per_page=per_page,
         total_pages=total_pages,
         total=total,
         hide_duplicates=hide_duplicates,
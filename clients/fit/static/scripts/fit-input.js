@@ -597,6 +597,22 @@ function showToast(message, type) {
 var rulesPanel = document.getElementById('submit-rules');
 var rulesVisible = false;
 
+/* Final validation result of a submission, pushed by the server */
+function watchSubmissionStatus(eventsUrl) {
+  if (typeof EventSource === 'undefined') return;
+  var source = new EventSource(eventsUrl);
+  source.addEventListener('status', function(e) {
+    var status = JSON.parse(e.data);
+    if (status.status === 'valid') {
+      source.close();
+      showToast('Submission #' + status.id + ' is valid: ' + status.objective_value + ' units.', 'success');
+    } else if (status.status === 'invalid') {
+      source.close();
+      showToast('Submission #' + status.id + ' was rejected: ' + (status.reason || 'invalid packing.'), 'error');
+    }
+  });
+}
+
 if (submitBtn) {
   submitBtn.addEventListener('mouseenter', function() {
     if (rulesPanel && submitBtn.disabled) {
@@ -640,6 +656,9 @@ if (submitBtn) {
         var msg = result.message || 'Solution submitted!';
         if (remaining !== null) msg += ' (' + remaining + ' remaining)';
         showToast(msg, 'success');
+        if (result.submission_id) {
+          watchSubmissionStatus('/api/fit/submission/' + result.submission_id + '/events');
+        }
       } else {
         const err = await res.json().catch(() => ({}));
         showToast(err.error || 'Submission failed.', 'error');
@@ -3,18 +3,21 @@
  * Depends on: all other fit-*.js. Load last.
  */
 
-/* Load submission from URL ?load=submission_id (from Explore Solutions "View in Fit") */
+/* Load from URL ?load=submission_id (Explore Solutions "View in Fit")
+   or ?reference=n (known-optimal chips) */
 var loadedFromUrl = false;
 (function checkLoadParam() {
   const params = new URLSearchParams(window.location.search);
   const loadId = params.get('load');
-  if (loadId) {
-    loadedFromUrl = true;
-    loadSubmissionIntoBoard(loadId);
-    const url = new URL(window.location.href);
-    url.searchParams.delete('load');
-    window.history.replaceState({}, '', url.pathname + (url.search || ''));
-  }
+  const referenceN = params.get('reference');
+  if (!loadId && !referenceN) return;
+  loadedFromUrl = true;
+  if (loadId) loadSubmissionIntoBoard(loadId);
+  else loadReferenceIntoBoard(referenceN);
+  const url = new URL(window.location.href);
+  url.searchParams.delete('load');
+  url.searchParams.delete('reference');
+  window.history.replaceState({}, '', url.pathname + (url.search || ''));
 })();
 
 requestAnimationFrame(function() {
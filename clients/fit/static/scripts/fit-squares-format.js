@@ -0,0 +1,62 @@
+/**
+ * Fit: decoders for the compact /api/submission squares formats.
+ * No dependencies; shared by the game and the explore page.
+ *
+ * Both decoders return columns: { n, cx, cy, ux, uy } as Float64Arrays.
+ */
+
+const FIT_SQUARES_FIELDS = ['cx', 'cy', 'ux', 'uy'];
+const FIT_LITTLE_ENDIAN = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+
+// ?format=f64 body: cx[n] cy[n] ux[n] uy[n] as little-endian float64
+function decodeSquaresF64(buffer) {
+  const n = buffer.byteLength / (8 * FIT_SQUARES_FIELDS.length);
+  let all;
+  if (FIT_LITTLE_ENDIAN) {
+    all = new Float64Array(buffer);
+  } else {
+    const view = new DataView(buffer);
+    all = new Float64Array(n * FIT_SQUARES_FIELDS.length);
+    for (let i = 0; i < all.length; i++) all[i] = view.getFloat64(i * 8, true);
+  }
+  const cols = { n: n };
+  FIT_SQUARES_FIELDS.forEach(function (field, i) {
+    cols[field] = all.subarray(i * n, (i + 1) * n);
+  });
+  return cols;
+}
+
+// ?format=q object: per-field delta-encoded integers at data.scale
+function decodeSquaresQ(data) {
+  const cols = { n: data.n };
+  FIT_SQUARES_FIELDS.forEach(function (field) {
+    const deltas = data[field];
+    const out = new Float64Array(data.n);
+    let acc = 0;
+    for (let i = 0; i < data.n; i++) {
+      acc += deltas[i];
+      out[i] = acc / data.scale;
+    }
+    cols[field] = out;
+  });
+  return cols;
+}
+
+function fetchF64Columns(url) {
+  return fetch(url)
+    .then(function (r) {
+      if (!r.ok) throw new Error('squares request failed');
+      return r.arrayBuffer();
+    })
+    .then(decodeSquaresF64);
+}
+
+// Fetches one submission's squares in the lossless binary format
+function fetchSquareColumns(submissionId) {
+  return fetchF64Columns('/api/submission/' + submissionId + '/squares?format=f64');
+}
+
+// Fetches the reference (proven or best-known) packing for n
+function fetchReferenceColumns(n) {
+  return fetchF64Columns('/api/fit/reference/' + n + '?format=f64');
+}
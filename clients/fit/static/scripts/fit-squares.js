@@ -1,6 +1,6 @@
 /**
  * Fit game: square CRUD, stats, clear-board modal, and submission loading.
- * Depends on: fit-constants.js, fit-geometry.js, fit-transform.js.
+ * Depends on: fit-constants.js, fit-geometry.js, fit-transform.js, fit-squares-format.js.
  */
 
 var MIN_SQUARES = 11;
@@ -141,16 +141,25 @@ function apiSquareToFit(apiSq) {
 
 /** Load a submission into the board (from ?load=id). Clears existing squares. */
 function loadSubmissionIntoBoard(submissionId) {
-  fetch('/api/submission/' + submissionId + '/squares')
-    .then(function (r) { return r.json(); })
-    .then(function (data) {
-      const apiSquares = data.squares || [];
+  loadColumnsIntoBoard(fetchSquareColumns(submissionId));
+}
+
+/** Load the reference packing for n (from ?reference=n). Clears existing squares. */
+function loadReferenceIntoBoard(n) {
+  loadColumnsIntoBoard(fetchReferenceColumns(n));
+}
+
+function loadColumnsIntoBoard(columnsPromise) {
+  columnsPromise
+    .then(function (cols) {
       undoStack = [];
       redoStack = [];
       clipboard = null;
       deleteAllSquares(true);
-      apiSquares.forEach(function (apiSq) {
-        const fitSq = apiSquareToFit(apiSq);
+      for (let i = 0; i < cols.n; i++) {
+        const fitSq = apiSquareToFit({
+          cx: cols.cx[i], cy: cols.cy[i], ux: cols.ux[i], uy: cols.uy[i]
+        });
         const sq = {
           id: 'sq-' + (++idCounter),
           x: fitSq.x,
@@ -160,7 +169,7 @@ function loadSubmissionIntoBoard(submissionId) {
         };
         squares.push(sq);
         board.appendChild(createSquareEl(sq));
-      });
+      }
       selectedSquareId = null;
       updateAllSquareClasses();
       updateSquareDataDisplay();
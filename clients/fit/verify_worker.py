@@ -5,6 +5,7 @@ import math
 import os
 import sys
 import time
+from datetime import timedelta
 
 ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 if ROOT not in sys.path:
@@ -16,7 +17,17 @@ try:
 except ImportError:
     pass
 
+from clients.fit.db.leaderboard import add_valid_submission
+from clients.fit.db.packing import unpack_squares
+from clients.fit.db.partitions import by_id, by_id_params
+from clients.fit.db.submissions import (
+    SUBMISSION_STATUS_CHANNEL,
+    assign_duplicate_rank,
+    status_payload,
+)
+from clients.fit.db.thumbnails import store_thumbnail
 from shared.db import get_cursor
+from shared.notify import notify
 
 VALIDATOR_VERSION = "fit-v2.0"
 SQUARE_SIZE = 56
@@ -29,6 +40,15 @@ UNIT_VEC_TOL = 1e-4
 OBJ_TOL = 0.0001
 DIAGONAL_TOL = 0.05
 
+# Pending submissions whose objective beats or ties the current best for
+# their square count, and that passed the submit-time geometry check, are
+# claimed as if submitted PRIORITY_BOOST_SECONDS earlier. The objective is
+# computed from the client's coordinates, so unchecked (async) submissions
+# are never boosted. Routine ones are never passed by a record submitted
+# more than that much later, so nothing starves.
+PRIORITY_BOOST_SECONDS = int(os.environ.get("FIT_PRIORITY_BOOST_SECONDS", 300))
+BEST_REFRESH_SECONDS = float(os.environ.get("FIT_BEST_REFRESH_SECONDS", 60))
+
 
 def corners_from_square_q(cx_q, cy_q, ux_q, uy_q):
     d_q = round(HALF * math.sqrt(2) * QUANT_SCALE)
@@ -194,25 +214,115 @@ def validate_submission(squares):
     return True, "All checks passed.", metrics
 
 
-def fetch_pending(limit=10):
+_best = {}
+_best_loaded_at = None
+
+
+# Best valid objective per square count, {n: objective}; re-read from the
+# leaderboard every BEST_REFRESH_SECONDS to pick up other workers' results
+def best_objectives():
+    global _best, _best_loaded_at
+    now = time.monotonic()
+    if _best_loaded_at is not None and now - _best_loaded_at < BEST_REFRESH_SECONDS:
+        return _best
+    with get_cursor(commit=False) as (conn, cur):
+        cur.execute(
+            """
+            SELECT c.square_count, b.objective_value
+            FROM fit_leaderboard_counts c
+            CROSS JOIN LATERAL (
+                SELECT objective_value
+                FROM fit_leaderboard l
+                WHERE l.square_count = c.square_count
+                ORDER BY objective_value
+                LIMIT 1
+            ) b
+            """
+        )
+        _best = {row["square_count"]: row["objective_value"] for row in cur.fetchall()}
+    _best_loaded_at = now
+    return _best
+
+
+def _note_valid(square_count, objective_value):
+    best = _best.get(square_count)
+    if objective_value is not None and (best is None or objective_value < best):
+        _best[square_count] = objective_value
+
+
+# Oldest first, with pre-validated would-be records (see
+# PRIORITY_BOOST_SECONDS) moved ahead. Two index-ordered reads, merged here:
+# the record candidates (submissions_pending_record_idx, one range per
+# square count in `best`) and the plain FIFO head (submissions_pending_idx).
+# A square count with no valid submission yet has no record to beat, so
+# its submissions are taken in arrival order.
+def fetch_pending(limit=10, best=None):
+    best = best or {}
     with get_cursor(commit=False) as (conn, cur):
+        candidates = []
+        if best:
+            # Materialized so the planner cannot walk submissions_pending_idx
+            # in created_at order looking for the (rare) candidates
+            cur.execute(
+                """
+                WITH candidates AS MATERIALIZED (
+                    SELECT s.id, s.objective_value, s.square_count, s.created_at
+                    FROM unnest(%s::int[], %s::float8[]) AS b(square_count, best)
+                    JOIN submissions s
+                      ON s.square_count = b.square_count
+                     AND s.objective_value <= b.best
+                    JOIN problem_instances pi ON s.instance_id = pi.id
+                    WHERE pi.domain = 'square_packing_rotatable'
+                      AND s.status = 'pending'
+                      AND s.pre_validated
+                )
+                SELECT * FROM candidates
+                ORDER BY created_at
+                LIMIT %s
+                """,
+                (list(best), list(best.values()), limit),
+            )
+            candidates = cur.fetchall()
         cur.execute(
             """
-            SELECT s.id, s.objective_value
+            SELECT s.id, s.objective_value, s.square_count, s.created_at
             FROM submissions s
             JOIN problem_instances pi ON s.instance_id = pi.id
             WHERE pi.domain = 'square_packing_rotatable'
               AND s.status = 'pending'
-            ORDER BY s.created_at ASC
+            ORDER BY s.created_at
             LIMIT %s
             """,
             (limit,),
         )
-        return cur.fetchall()
+        fifo = cur.fetchall()
+
+    boost = timedelta(seconds=PRIORITY_BOOST_SECONDS)
+    merged = {}
+    for row in fifo:
+        row["is_record"] = False
+        merged[row["id"]] = row
+    for row in candidates:
+        row["is_record"] = True
+        merged[row["id"]] = row
+    rows = sorted(
+        merged.values(),
+        key=lambda r: (r["created_at"] - boost if r["is_record"] else r["created_at"],
+                       r["created_at"]),
+    )
+    return rows[:limit]
 
 
-def fetch_squares(submission_id):
+def fetch_squares(submission_id, square_count=None):
     with get_cursor(commit=False) as (conn, cur):
+        cur.execute(
+            f"SELECT square_count, squares_packed FROM submissions "
+            f"WHERE {by_id(square_count)}",
+            by_id_params(submission_id, square_count),
+        )
+        row = cur.fetchone()
+        if row and row["squares_packed"] is not None:
+            return unpack_squares(row["squares_packed"], row["square_count"])
         cur.execute(
             """
             SELECT idx, cx, cy, ux, uy, cx_q, cy_q, ux_q, uy_q
@@ -225,7 +335,10 @@ def fetch_squares(submission_id):
         return cur.fetchall()
 
 
-def record_result(submission_id, valid, reason, metrics, obj_from_db):
+# Returns the updated submission row, with `waited` (seconds since it was
+# submitted), or None if the id is gone
+def record_result(submission_id, valid, reason, metrics, obj_from_db, square_count=None,
+                  squares=None):
     with get_cursor() as (conn, cur):
         status = "valid" if valid else "invalid"
         cur.execute(
@@ -252,27 +365,63 @@ def record_result(submission_id, valid, reason, metrics, obj_from_db):
                 update_fields.append("objective_value = %s")
                 update_vals.append(computed)
 
-        update_vals.append(submission_id)
+        update_vals.extend(by_id_params(submission_id, square_count))
         cur.execute(
-            f"UPDATE submissions SET {', '.join(update_fields)} WHERE id = %s",
+            f"UPDATE submissions SET {', '.join(update_fields)} "
+            f"WHERE {by_id(square_count)} "
+            "RETURNING id, instance_id, square_count, user_id, objective_value, "
+            "min_slack, created_at, is_duplicate, duplicate_number, pre_validated, "
+            "EXTRACT(EPOCH FROM NOW() - created_at) AS waited",
             update_vals,
         )
+        row = cur.fetchone()
+        if valid and row:
+            if not row["pre_validated"]:
+                # Async submits are ranked among equal bounds only once valid
+                rank = assign_duplicate_rank(
+                    cur, row["instance_id"], row["square_count"],
+                    row["objective_value"], submission_id,
+                )
+                if rank > 1:
+                    row["is_duplicate"] = True
+                    row["duplicate_number"] = rank
+            add_valid_submission(cur, row)
+            if squares:
+                store_thumbnail(cur, submission_id, squares)
+        if row:
+            # Delivered on commit to clients waiting on the events API
+            row["status"] = status
+            notify(cur, SUBMISSION_STATUS_CHANNEL, status_payload(row, reason))
+        return row
 
 
 def process_batch(limit=10):
-    pending = fetch_pending(limit)
+    pending = fetch_pending(limit, best_objectives())
     if not pending:
         return 0
 
+    waits = []
     for sub in pending:
         sid = sub["id"]
         obj_from_db = sub.get("objective_value")
-        squares = fetch_squares(sid)
+        n = sub.get("square_count")
+        squares = fetch_squares(sid, n)
         valid, reason, metrics = validate_submission(squares)
-        record_result(sid, valid, reason, metrics, obj_from_db)
+        row = record_result(sid, valid, reason, metrics, obj_from_db, n, squares)
         status = "VALID" if valid else "INVALID"
-        print(f"  [{status}] submission {sid}: {reason}")
-
+        note = ""
+        if valid and row:
+            _note_valid(n, row["objective_value"])
+            waits.append(float(row["waited"]))
+            note = f" ({float(row['waited']):.1f}s to leaderboard"
+            note += ", priority)" if sub.get("is_record") else ")"
+        print(f"  [{status}] submission {sid}: {reason}{note}")
+
+    if waits:
+        print(
+            f"  Time to leaderboard: max {max(waits):.1f}s, "
+            f"mean {sum(waits) / len(waits):.1f}s over {len(waits)} submission(s)"
+        )
     return len(pending)
 
 
@@ -291,6 +440,7 @@ def main():
     print(f"  Database: {os.environ.get('DATABASE_URL', '(default)')}")
     print(f"  Policy: conservative (reject if uncertain)")
     print(f"  Overlap: exact integer SAT (quant_scale={QUANT_SCALE})")
+    print(f"  Priority: records first, boost={PRIORITY_BOOST_SECONDS}s")
 
     if args.loop:
         print(f"  Mode: continuous (interval={args.interval}s, batch={args.batch})")
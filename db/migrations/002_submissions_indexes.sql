@@ -0,0 +1,38 @@
+-- Primary keys and indexes for the submissions database.
+-- Without these every solution_hash lookup, pending scan, rate-limit count
+-- and submission_squares join is a sequential scan.
+
+ALTER TABLE "submission_squares"
+  ADD CONSTRAINT "submission_squares_pkey" PRIMARY KEY ("submission_id", "idx");
+
+ALTER TABLE "workspace_squares"
+  ADD CONSTRAINT "workspace_squares_pkey" PRIMARY KEY ("workspace_id", "idx");
+
+-- get_or_create_fit_instance / explorer joins
+CREATE INDEX IF NOT EXISTS "problem_instances_domain_idx"
+  ON "problem_instances" ("domain");
+
+-- identical-solution check in create_fit_submission
+CREATE INDEX IF NOT EXISTS "submissions_instance_hash_idx"
+  ON "submissions" ("instance_id", "solution_hash");
+
+-- duplicate-bounds lookup in create_fit_submission
+CREATE INDEX IF NOT EXISTS "submissions_instance_objective_idx"
+  ON "submissions" ("instance_id", "objective_value", "created_at");
+
+-- verify_worker.fetch_pending
+CREATE INDEX IF NOT EXISTS "submissions_pending_idx"
+  ON "submissions" ("created_at")
+  WHERE "status" = 'pending';
+
+-- explorer: get_available_square_counts, get_best_submissions, get_top_valid_ids
+CREATE INDEX IF NOT EXISTS "submissions_valid_objective_idx"
+  ON "submissions" ("objective_value", "created_at")
+  WHERE "status" = 'valid';
+
+-- shared.rate_limit.check_rate_limit and get_user_submissions
+CREATE INDEX IF NOT EXISTS "submissions_user_created_idx"
+  ON "submissions" ("user_id", "created_at");
+
+CREATE INDEX IF NOT EXISTS "validation_runs_submission_idx"
+  ON "validation_runs" ("submission_id");
@@ -0,0 +1,30 @@
+-- Store each submission's geometry as one packed bytea on the submission
+-- instead of one submission_squares row per square.
+-- Layout is documented in clients/fit/db/packing.py.
+--
+-- After running this, pack existing rows with:
+--   python -m clients.fit.db.packing
+-- Legacy rows in submission_squares are still read while squares_packed is NULL.
+
+ALTER TABLE "submissions" ADD COLUMN IF NOT EXISTS "square_count" integer;
+ALTER TABLE "submissions" ADD COLUMN IF NOT EXISTS "squares_packed" bytea;
+
+UPDATE "submissions" s
+SET "square_count" = (
+  SELECT COUNT(*) FROM "submission_squares" ss WHERE ss."submission_id" = s."id"
+)
+WHERE s."square_count" IS NULL;
+
+ALTER TABLE "submissions" ALTER COLUMN "square_count" SET NOT NULL;
+
+-- Explorer queries filter by square count instead of joining submission_squares.
+DROP INDEX IF EXISTS "submissions_valid_objective_idx";
+CREATE INDEX IF NOT EXISTS "submissions_valid_n_objective_idx"
+  ON "submissions" ("square_count", "objective_value", "created_at")
+  WHERE "status" = 'valid';
+
+DROP INDEX IF EXISTS "submissions_instance_objective_idx";
+CREATE INDEX IF NOT EXISTS "submissions_instance_objective_idx"
+  ON "submissions" ("instance_id", "objective_value", "square_count", "created_at");
+
+COMMENT ON COLUMN "submissions"."squares_packed" IS 'Packed geometry, see clients/fit/db/packing.py; NULL means rows in submission_squares';
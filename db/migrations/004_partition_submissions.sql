@@ -0,0 +1,93 @@
+-- Partition submissions by square_count range.
+-- Explorer queries always filter on square_count, so per-n reads only touch
+-- one partition; the pending/valid partial indexes are created per partition.
+--
+-- submission_squares is not partitioned: since 003 new submissions store
+-- their geometry in submissions.squares_packed, so it only holds legacy rows.
+--
+-- Postgres requires unique constraints on a partitioned table to include the
+-- partition key, so the primary key becomes (id, square_count) and the
+-- foreign keys from submission_squares / validation_runs are dropped.
+--
+-- Archiving a range later:
+--   ALTER TABLE submissions DETACH PARTITION submissions_n_0000_0063;
+
+BEGIN;
+
+ALTER TABLE "submission_squares" DROP CONSTRAINT IF EXISTS "subsq_sub";
+ALTER TABLE "validation_runs" DROP CONSTRAINT IF EXISTS "val_sub";
+
+ALTER TABLE "submissions" RENAME TO "submissions_unpartitioned";
+ALTER TABLE "submissions_unpartitioned" ALTER COLUMN "id" DROP IDENTITY IF EXISTS;
+ALTER TABLE "submissions_unpartitioned" DROP CONSTRAINT IF EXISTS "submissions_pkey";
+DROP INDEX IF EXISTS "submissions_instance_hash_idx";
+DROP INDEX IF EXISTS "submissions_instance_objective_idx";
+DROP INDEX IF EXISTS "submissions_pending_idx";
+DROP INDEX IF EXISTS "submissions_valid_n_objective_idx";
+DROP INDEX IF EXISTS "submissions_user_created_idx";
+
+CREATE SEQUENCE "submissions_id_seq" AS bigint;
+
+CREATE TABLE "submissions" (
+  "id" bigint NOT NULL DEFAULT nextval('submissions_id_seq'),
+  "instance_id" bigint NOT NULL,
+  "user_id" bigint,
+  "workspace_id" bigint,
+  "status" varchar NOT NULL DEFAULT 'pending',
+  "objective_value" double precision,
+  "min_slack" double precision,
+  "solution_hash" bytea NOT NULL,
+  "is_duplicate" boolean NOT NULL DEFAULT false,
+  "duplicate_number" integer,
+  "created_at" timestamp NOT NULL DEFAULT (now()),
+  "square_count" integer NOT NULL,
+  "squares_packed" bytea,
+  PRIMARY KEY ("id", "square_count")
+) PARTITION BY RANGE ("square_count");
+
+ALTER SEQUENCE "submissions_id_seq" OWNED BY "submissions"."id";
+
+CREATE TABLE "submissions_n_0000_0063" PARTITION OF "submissions" FOR VALUES FROM (0) TO (64);
+CREATE TABLE "submissions_n_0064_0127" PARTITION OF "submissions" FOR VALUES FROM (64) TO (128);
+CREATE TABLE "submissions_n_0128_0255" PARTITION OF "submissions" FOR VALUES FROM (128) TO (256);
+CREATE TABLE "submissions_n_0256_0511" PARTITION OF "submissions" FOR VALUES FROM (256) TO (512);
+CREATE TABLE "submissions_n_0512_1023" PARTITION OF "submissions" FOR VALUES FROM (512) TO (1024);
+CREATE TABLE "submissions_n_1024_2048" PARTITION OF "submissions" FOR VALUES FROM (1024) TO (2049);
+CREATE TABLE "submissions_n_default" PARTITION OF "submissions" DEFAULT;
+
+ALTER TABLE "submissions" ADD CONSTRAINT "sub_inst"
+  FOREIGN KEY ("instance_id") REFERENCES "problem_instances" ("id");
+
+INSERT INTO "submissions"
+  ("id", "instance_id", "user_id", "workspace_id", "status", "objective_value",
+   "min_slack", "solution_hash", "is_duplicate", "duplicate_number",
+   "created_at", "square_count", "squares_packed")
+SELECT "id", "instance_id", "user_id", "workspace_id", "status", "objective_value",
+       "min_slack", "solution_hash", "is_duplicate", "duplicate_number",
+       "created_at", "square_count", "squares_packed"
+FROM "submissions_unpartitioned";
+
+SELECT setval('submissions_id_seq', COALESCE(MAX("id"), 0) + 1, false) FROM "submissions";
+
+DROP TABLE "submissions_unpartitioned";
+
+-- Same index set as 002/003, now created on every partition.
+CREATE INDEX "submissions_instance_hash_idx"
+  ON "submissions" ("instance_id", "solution_hash");
+CREATE INDEX "submissions_instance_objective_idx"
+  ON "submissions" ("instance_id", "objective_value", "square_count", "created_at");
+CREATE INDEX "submissions_pending_idx"
+  ON "submissions" ("created_at")
+  WHERE "status" = 'pending';
+CREATE INDEX "submissions_valid_n_objective_idx"
+  ON "submissions" ("square_count", "objective_value", "created_at")
+  WHERE "status" = 'valid';
+CREATE INDEX "submissions_user_created_idx"
+  ON "submissions" ("user_id", "created_at");
+
+COMMENT ON COLUMN "submissions"."status" IS 'pending | valid | invalid';
+COMMENT ON COLUMN "submissions"."is_duplicate" IS 'True if another submission with the same bounds (objective_value) and square count exists';
+COMMENT ON COLUMN "submissions"."duplicate_number" IS '1-based rank among submissions sharing the same bounds and square count, ordered by created_at';
+COMMENT ON COLUMN "submissions"."squares_packed" IS 'Packed geometry, see clients/fit/db/packing.py; NULL means rows in submission_squares';
+
+COMMIT;
@@ -0,0 +1,49 @@
+-- Per-n leaderboard of valid Fit submissions, maintained by the verify worker
+-- (clients/fit/db/leaderboard.py) in the same transaction that marks a
+-- submission valid. The explorer reads pages and counts from here instead of
+-- aggregating submissions on every request.
+
+BEGIN;
+
+CREATE TABLE "fit_leaderboard" (
+  "square_count" integer NOT NULL,
+  "objective_value" double precision NOT NULL,
+  "created_at" timestamp NOT NULL,
+  "submission_id" bigint NOT NULL UNIQUE,
+  "user_id" bigint,
+  "min_slack" double precision,
+  "is_duplicate" boolean NOT NULL DEFAULT false,
+  "duplicate_number" integer,
+  PRIMARY KEY ("square_count", "objective_value", "created_at", "submission_id")
+);
+
+-- "Hide duplicates" view: first of each set of equal bounds only.
+CREATE INDEX "fit_leaderboard_unique_idx"
+  ON "fit_leaderboard" ("square_count", "objective_value", "created_at", "submission_id")
+  WHERE ("is_duplicate" = false OR "duplicate_number" = 1);
+
+CREATE TABLE "fit_leaderboard_counts" (
+  "square_count" integer PRIMARY KEY,
+  "submission_count" integer NOT NULL DEFAULT 0,
+  "unique_count" integer NOT NULL DEFAULT 0
+);
+
+INSERT INTO "fit_leaderboard"
+  ("square_count", "objective_value", "created_at", "submission_id", "user_id",
+   "min_slack", "is_duplicate", "duplicate_number")
+SELECT s."square_count", s."objective_value", s."created_at", s."id", s."user_id",
+       s."min_slack", s."is_duplicate", s."duplicate_number"
+FROM "submissions" s
+JOIN "problem_instances" pi ON s."instance_id" = pi."id"
+WHERE pi."domain" = 'square_packing_rotatable'
+  AND s."status" = 'valid'
+  AND s."objective_value" IS NOT NULL;
+
+INSERT INTO "fit_leaderboard_counts" ("square_count", "submission_count", "unique_count")
+SELECT "square_count",
+       COUNT(*),
+       COUNT(*) FILTER (WHERE "is_duplicate" = false OR "duplicate_number" = 1)
+FROM "fit_leaderboard"
+GROUP BY "square_count";
+
+COMMIT;
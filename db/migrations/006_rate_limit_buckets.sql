@@ -0,0 +1,22 @@
+-- Per-user submission counters bucketed per minute, maintained in the same
+-- transaction as the submission insert (shared/rate_limit.py). The rate
+-- limit check sums at most one window of buckets instead of counting rows.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS "rate_limit_buckets" (
+  "user_id" bigint NOT NULL,
+  "bucket_start" timestamp NOT NULL,
+  "count" integer NOT NULL DEFAULT 0,
+  PRIMARY KEY ("user_id", "bucket_start")
+);
+
+INSERT INTO "rate_limit_buckets" ("user_id", "bucket_start", "count")
+SELECT "user_id", date_trunc('minute', "created_at"), COUNT(*)
+FROM "submissions"
+WHERE "user_id" IS NOT NULL
+  AND "created_at" > NOW() - INTERVAL '1 day'
+GROUP BY "user_id", date_trunc('minute', "created_at")
+ON CONFLICT ("user_id", "bucket_start") DO NOTHING;
+
+COMMIT;
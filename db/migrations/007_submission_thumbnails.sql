@@ -0,0 +1,9 @@
+-- SVG previews of valid Fit submissions, rendered by the verify worker in the
+-- same transaction that marks a submission valid (clients/fit/db/thumbnails.py).
+-- Existing valid submissions: python -m clients.fit.db.thumbnails
+
+CREATE TABLE IF NOT EXISTS "submission_thumbnails" (
+  "submission_id" bigint PRIMARY KEY,
+  "svg" text NOT NULL,
+  "created_at" timestamp NOT NULL DEFAULT NOW()
+);
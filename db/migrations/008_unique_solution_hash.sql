@@ -0,0 +1,43 @@
+-- Exact-duplicate rejection and duplicate ranks without scans on the submit
+-- path. A unique index on the solution hash lets the insert itself reject an
+-- identical solution (ON CONFLICT DO NOTHING), so two concurrent submits can
+-- no longer both pass a lookup. Ranks among equal bounds come from a counter
+-- row per (instance, square count, objective) that the submit bumps in the
+-- same transaction (clients/fit/db/submissions.py). Earlier rows are never
+-- rewritten: the first of a set keeps is_duplicate = false and a NULL rank,
+-- which the "hide duplicates" filters already treat as the representative.
+--
+-- The unique index fails to build if identical rows already exist; list them
+-- with:
+--   SELECT instance_id, solution_hash, square_count, array_agg(id ORDER BY id)
+--   FROM submissions
+--   GROUP BY instance_id, solution_hash, square_count
+--   HAVING COUNT(*) > 1;
+
+BEGIN;
+
+-- Unique indexes on a partitioned table must include the partition key. The
+-- hash covers every square, so square_count adds nothing to the key.
+CREATE UNIQUE INDEX "submissions_instance_hash_key"
+  ON "submissions" ("instance_id", "solution_hash", "square_count");
+DROP INDEX IF EXISTS "submissions_instance_hash_idx";
+
+CREATE TABLE "fit_duplicate_counts" (
+  "instance_id" bigint NOT NULL,
+  "square_count" integer NOT NULL,
+  "objective_value" double precision NOT NULL,
+  "submission_count" integer NOT NULL DEFAULT 0,
+  PRIMARY KEY ("instance_id", "square_count", "objective_value")
+);
+
+INSERT INTO "fit_duplicate_counts"
+  ("instance_id", "square_count", "objective_value", "submission_count")
+SELECT "instance_id", "square_count", "objective_value", COUNT(*)
+FROM "submissions"
+WHERE "objective_value" IS NOT NULL
+GROUP BY "instance_id", "square_count", "objective_value";
+
+COMMENT ON COLUMN "submissions"."is_duplicate" IS 'True if an earlier submission with the same bounds (objective_value) and square count exists';
+COMMENT ON COLUMN "submissions"."duplicate_number" IS '1-based rank among submissions sharing the same bounds and square count, in insert order; NULL (or 1 on older rows) for the first';
+
+COMMIT;
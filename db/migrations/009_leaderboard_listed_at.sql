@@ -0,0 +1,15 @@
+-- When each leaderboard row was added, to measure how long submissions wait
+-- between being submitted (created_at) and showing up on the leaderboard.
+-- Rows from before this migration keep a NULL listed_at; the verify worker's
+-- inserts take the default.
+
+BEGIN;
+
+ALTER TABLE "fit_leaderboard" ADD COLUMN "listed_at" timestamp;
+ALTER TABLE "fit_leaderboard" ALTER COLUMN "listed_at" SET DEFAULT now();
+
+CREATE INDEX "fit_leaderboard_listed_idx"
+  ON "fit_leaderboard" ("listed_at")
+  WHERE "listed_at" IS NOT NULL;
+
+COMMIT;
@@ -0,0 +1,7 @@
+-- Whether the submit path ran the full geometric pre-check (sync submits do,
+-- async ones do not). The verify worker only fast-tracks would-be records
+-- that passed it, since objective_value comes from the client's own
+-- coordinates. Rows from before this migration count as not pre-validated.
+
+ALTER TABLE "submissions"
+  ADD COLUMN IF NOT EXISTS "pre_validated" boolean NOT NULL DEFAULT false;
@@ -0,0 +1,12 @@
+-- Record candidates for the verify worker (verify_worker.fetch_pending):
+-- pending, pre-validated submissions looked up by square count and objective
+-- at or below the current best. Kept apart from the FIFO read on
+-- submissions_pending_idx so neither has to sort the whole pending set.
+
+BEGIN;
+
+CREATE INDEX "submissions_pending_record_idx"
+  ON "submissions" ("square_count", "objective_value")
+  WHERE "status" = 'pending' AND "pre_validated";
+
+COMMIT;
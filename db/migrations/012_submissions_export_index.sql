@@ -0,0 +1,12 @@
+-- Keyset reads of the export (clients/fit/db/submissions.py,
+-- iter_submissions_for_export): one square count and status in id order,
+-- resumed after the last id sent. With this index the rows stream straight
+-- off the index instead of being collected and sorted before the first one
+-- is sent.
+
+BEGIN;
+
+CREATE INDEX "submissions_export_idx"
+  ON "submissions" ("square_count", "status", "id");
+
+COMMIT;
@@ -2,6 +2,9 @@
 -- This database stores problem instances, submissions, and validation data.
 -- User accounts live in the separate auth database; user_id columns here are
 -- plain bigints with no foreign key constraint to the auth DB.
+--
+-- This is the state after every migration in db/migrations (through 010);
+-- keep it in step when adding one.
 
 CREATE TABLE "problem_instances" (
   "id" BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
@@ -37,8 +40,12 @@ CREATE TABLE "workspace_squares" (
   "pinned" boolean NOT NULL DEFAULT false
 );
 
+-- Partitioned by square count; unique constraints must include the
+-- partition key, hence the (id, square_count) primary key.
+CREATE SEQUENCE "submissions_id_seq" AS bigint;
+
 CREATE TABLE "submissions" (
-  "id" BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  "id" bigint NOT NULL DEFAULT nextval('submissions_id_seq'),
   "instance_id" bigint NOT NULL,
   "user_id" bigint,
   "workspace_id" bigint,
@@ -48,8 +55,22 @@ CREATE TABLE "submissions" (
   "solution_hash" bytea NOT NULL,
   "is_duplicate" boolean NOT NULL DEFAULT false,
   "duplicate_number" integer,
-  "created_at" timestamp NOT NULL DEFAULT (now())
-);
+  "created_at" timestamp NOT NULL DEFAULT (now()),
+  "square_count" integer NOT NULL,
+  "squares_packed" bytea,
+  "pre_validated" boolean NOT NULL DEFAULT false,
+  PRIMARY KEY ("id", "square_count")
+) PARTITION BY RANGE ("square_count");
+
+ALTER SEQUENCE "submissions_id_seq" OWNED BY "submissions"."id";
+
+CREATE TABLE "submissions_n_0000_0063" PARTITION OF "submissions" FOR VALUES FROM (0) TO (64);
+CREATE TABLE "submissions_n_0064_0127" PARTITION OF "submissions" FOR VALUES FROM (64) TO (128);
+CREATE TABLE "submissions_n_0128_0255" PARTITION OF "submissions" FOR VALUES FROM (128) TO (256);
+CREATE TABLE "submissions_n_0256_0511" PARTITION OF "submissions" FOR VALUES FROM (256) TO (512);
+CREATE TABLE "submissions_n_0512_1023" PARTITION OF "submissions" FOR VALUES FROM (512) TO (1024);
+CREATE TABLE "submissions_n_1024_2048" PARTITION OF "submissions" FOR VALUES FROM (1024) TO (2049);
+CREATE TABLE "submissions_n_default" PARTITION OF "submissions" DEFAULT;
 
 CREATE TABLE "submission_squares" (
   "submission_id" bigint NOT NULL,
@@ -75,11 +96,86 @@ CREATE TABLE "validation_runs" (
   "created_at" timestamp NOT NULL DEFAULT (now())
 );
 
+-- Per-n leaderboard of valid submissions, maintained by the verify worker
+CREATE TABLE "fit_leaderboard" (
+  "square_count" integer NOT NULL,
+  "objective_value" double precision NOT NULL,
+  "created_at" timestamp NOT NULL,
+  "submission_id" bigint NOT NULL UNIQUE,
+  "user_id" bigint,
+  "min_slack" double precision,
+  "is_duplicate" boolean NOT NULL DEFAULT false,
+  "duplicate_number" integer,
+  "listed_at" timestamp DEFAULT (now()),
+  PRIMARY KEY ("square_count", "objective_value", "created_at", "submission_id")
+);
+
+CREATE TABLE "fit_leaderboard_counts" (
+  "square_count" integer PRIMARY KEY,
+  "submission_count" integer NOT NULL DEFAULT 0,
+  "unique_count" integer NOT NULL DEFAULT 0
+);
+
+-- Submissions per set of equal bounds; gives each new one its duplicate rank
+CREATE TABLE "fit_duplicate_counts" (
+  "instance_id" bigint NOT NULL,
+  "square_count" integer NOT NULL,
+  "objective_value" double precision NOT NULL,
+  "submission_count" integer NOT NULL DEFAULT 0,
+  PRIMARY KEY ("instance_id", "square_count", "objective_value")
+);
+
+CREATE TABLE "rate_limit_buckets" (
+  "user_id" bigint NOT NULL,
+  "bucket_start" timestamp NOT NULL,
+  "count" integer NOT NULL DEFAULT 0,
+  PRIMARY KEY ("user_id", "bucket_start")
+);
+
+CREATE TABLE "submission_thumbnails" (
+  "submission_id" bigint PRIMARY KEY,
+  "svg" text NOT NULL,
+  "created_at" timestamp NOT NULL DEFAULT (now())
+);
+
+ALTER TABLE "submission_squares"
+  ADD CONSTRAINT "submission_squares_pkey" PRIMARY KEY ("submission_id", "idx");
+ALTER TABLE "workspace_squares"
+  ADD CONSTRAINT "workspace_squares_pkey" PRIMARY KEY ("workspace_id", "idx");
+
+CREATE INDEX "problem_instances_domain_idx" ON "problem_instances" ("domain");
+CREATE UNIQUE INDEX "submissions_instance_hash_key"
+  ON "submissions" ("instance_id", "solution_hash", "square_count");
+CREATE INDEX "submissions_instance_objective_idx"
+  ON "submissions" ("instance_id", "objective_value", "square_count", "created_at");
+CREATE INDEX "submissions_pending_idx"
+  ON "submissions" ("created_at")
+  WHERE "status" = 'pending';
+CREATE INDEX "submissions_pending_record_idx"
+  ON "submissions" ("square_count", "objective_value")
+  WHERE "status" = 'pending' AND "pre_validated";
+CREATE INDEX "submissions_valid_n_objective_idx"
+  ON "submissions" ("square_count", "objective_value", "created_at")
+  WHERE "status" = 'valid';
+CREATE INDEX "submissions_export_idx"
+  ON "submissions" ("square_count", "status", "id");
+CREATE INDEX "submissions_user_created_idx"
+  ON "submissions" ("user_id", "created_at");
+CREATE INDEX "validation_runs_submission_idx" ON "validation_runs" ("submission_id");
+CREATE INDEX "fit_leaderboard_unique_idx"
+  ON "fit_leaderboard" ("square_count", "objective_value", "created_at", "submission_id")
+  WHERE ("is_duplicate" = false OR "duplicate_number" = 1);
+CREATE INDEX "fit_leaderboard_listed_idx"
+  ON "fit_leaderboard" ("listed_at")
+  WHERE "listed_at" IS NOT NULL;
+
 COMMENT ON COLUMN "problem_instances"."domain" IS 'square_packing_rotatable';
 COMMENT ON TABLE "workspace_squares" IS 'Primary key is (workspace_id, idx)';
 COMMENT ON COLUMN "submissions"."status" IS 'pending | valid | invalid';
-COMMENT ON COLUMN "submissions"."is_duplicate" IS 'True if another submission with the same bounds (objective_value) and square count exists';
-COMMENT ON COLUMN "submissions"."duplicate_number" IS '1-based rank among submissions sharing the same bounds and square count, ordered by created_at';
+COMMENT ON COLUMN "submissions"."is_duplicate" IS 'True if an earlier submission with the same bounds (objective_value) and square count exists';
+COMMENT ON COLUMN "submissions"."duplicate_number" IS '1-based rank among submissions sharing the same bounds and square count, in insert order (async submits: when found valid); NULL (or 1 on older rows) for the first';
+COMMENT ON COLUMN "submissions"."squares_packed" IS 'Packed geometry, see clients/fit/db/packing.py; NULL means rows in submission_squares';
+COMMENT ON COLUMN "submissions"."pre_validated" IS 'True if the submit path ran the full geometric pre-check (sync submits)';
 COMMENT ON TABLE "submission_squares" IS 'Primary key is (submission_id, idx)';
 
 ALTER TABLE "workspaces" ADD CONSTRAINT "ws_instance"
@@ -91,8 +187,5 @@ ALTER TABLE "workspace_squares" ADD CONSTRAINT "wsq_ws"
 ALTER TABLE "submissions" ADD CONSTRAINT "sub_inst"
   FOREIGN KEY ("instance_id") REFERENCES "problem_instances" ("id");
 
-ALTER TABLE "submission_squares" ADD CONSTRAINT "subsq_sub"
-  FOREIGN KEY ("submission_id") REFERENCES "submissions" ("id");
-
-ALTER TABLE "validation_runs" ADD CONSTRAINT "val_sub"
-  FOREIGN KEY ("submission_id") REFERENCES "submissions" ("id");
+-- No foreign keys into submissions: its primary key is (id, square_count),
+-- and submission_squares / validation_runs reference the id alone.
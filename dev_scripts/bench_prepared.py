@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# Benchmark: planning time and wall time of the hot submit-path statements,
+# sent as plain SQL (re-planned every time) vs executed by name after PREPARE.
+#
+# Needs DATABASE_URL pointing at a local database with all migrations applied.
+# Everything runs in one transaction that is rolled back at the end.
+#
+#   python dev_scripts/bench_prepared.py [iterations]
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(ROOT, ".env"))
+except ImportError:
+    pass
+
+import psycopg2
+
+import clients.fit.db.submissions  # noqa: F401  (registers statements)
+import shared.rate_limit  # noqa: F401
+from clients.fit.db.packing import pack_squares
+from shared.db import _statements, execute_prepared, get_connection
+
+
+def _plain_sql(sql):
+    return re.sub(r"\$(\d+)", lambda m: f"%(p{m.group(1)})s", sql)
+
+
+def _plain_params(params):
+    return {f"p{i}": v for i, v in enumerate(params, start=1)}
+
+
+def _planning_ms(cur, sql, params):
+    cur.execute("EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) " + sql, params)
+    return cur.fetchone()["QUERY PLAN"][0]["Planning Time"]
+
+
+# make_params() is called per execution, so inserts can use fresh keys
+def _bench(cur, name, make_params, iterations):
+    sql = _plain_sql(_statements[name])
+
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        cur.execute(sql, _plain_params(make_params()))
+        cur.fetchall()
+    plain_ms = (time.perf_counter() - t0) * 1000 / iterations
+
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        execute_prepared(cur, name, make_params())
+        cur.fetchall()
+    prepared_ms = (time.perf_counter() - t0) * 1000 / iterations
+
+    params = make_params()
+    named = _plain_params(params)
+    placeholders = ", ".join(["%s"] * len(params))
+    execute_sql = f"EXECUTE {name} ({placeholders})" if params else f"EXECUTE {name}"
+    return (
+        _planning_ms(cur, sql, named),
+        _planning_ms(cur, execute_sql, params),
+        plain_ms,
+        prepared_ms,
+    )
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO problem_instances
+                (domain, n, square_size, container_type, allow_rotation, quant_scale)
+            VALUES ('square_packing_rotatable', 0, 56, 'square', true, 1000000000)
+            RETURNING id
+            """
+        )
+        instance_id = cur.fetchone()["id"]
+        packed = psycopg2.Binary(pack_squares([
+            {"cx": i * 56.0, "cy": 0.0, "ux": 1.0, "uy": 0.0,
+             "cx_q": i * 56 * 10**9, "cy_q": 0, "ux_q": 10**9, "uy_q": 0}
+            for i in range(11)
+        ]))
+        cases = [
+            ("fit_instance_lookup", lambda: ()),
+            ("fit_submission_insert", lambda: (
+                instance_id, 1, 3.5, psycopg2.Binary(os.urandom(32)), 11, packed, True,
+            )),
+            ("fit_duplicate_rank", lambda: (instance_id, 11, 3.5)),
+            ("rate_limit_window", lambda: (1, 3600)),
+        ]
+
+        print(f"{iterations} iterations per statement\n")
+        print(f"  {'statement':28s} {'plan ms':>9s} {'plan ms':>9s} {'wall ms':>9s} {'wall ms':>9s}")
+        print(f"  {'':28s} {'plain':>9s} {'prepared':>9s} {'plain':>9s} {'prepared':>9s}")
+        for name, params in cases:
+            plan_plain, plan_prep, wall_plain, wall_prep = _bench(
+                cur, name, params, iterations
+            )
+            print(
+                f"  {name:28s} {plan_plain:9.3f} {plan_prep:9.3f} "
+                f"{wall_plain:9.3f} {wall_prep:9.3f}"
+            )
+        cur.close()
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# Checks the shared per-IP limiter: limits hold across processes, idle IPs
+# are evicted instead of growing memory, and X-Forwarded-For is resolved
+# through the trusted proxy hop only.
+#
+#   python dev_scripts/test_ip_limiter.py
+import multiprocessing
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ["IP_LIMITER_DIR"] = tempfile.mkdtemp(prefix="ip-limiter-")
+
+from flask import Flask, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from shared.ip_limiter import SharedRateLimiter
+
+WINDOW = 3600
+NOW = 1_000_000 * WINDOW + 10
+
+
+def _worker(args):
+    name, key, hits = args
+    limiter = SharedRateLimiter(name, WINDOW)
+    return sum(limiter.hit(key, 40, now=NOW)[0] for _ in range(hits))
+
+
+def test_shared_across_processes():
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        allowed = sum(pool.map(_worker, [("shared", "203.0.113.7", 25)] * 4))
+    assert allowed == 40, f"expected 40 allowed across workers, got {allowed}"
+    ok, retry = SharedRateLimiter("shared", WINDOW).hit("203.0.113.7", 40, now=NOW)
+    assert not ok and retry > 0
+    print("  >>> PASS: limit shared across 4 processes")
+
+
+def test_sliding_window():
+    limiter = SharedRateLimiter("sliding", WINDOW)
+    for _ in range(10):
+        assert limiter.hit("198.51.100.1", 10, now=NOW)[0]
+    ok, retry = limiter.hit("198.51.100.1", 10, now=NOW)
+    assert not ok
+    # Halfway into the next window half of the previous count still applies
+    later = NOW - 10 + WINDOW + WINDOW // 2
+    allowed = sum(limiter.hit("198.51.100.1", 10, now=later)[0] for _ in range(10))
+    assert allowed == 5, f"expected 5 allowed, got {allowed}"
+    print("  >>> PASS: sliding-window counting")
+
+
+def test_cost():
+    limiter = SharedRateLimiter("cost", WINDOW)
+    assert limiter.hit("198.51.100.2", 100, now=NOW, cost=0)[0]
+    assert limiter.hit("198.51.100.2", 100, now=NOW, cost=60)[0]
+    # Allowed while under the limit; the hit that crosses it still counts
+    assert limiter.hit("198.51.100.2", 100, now=NOW, cost=60)[0]
+    ok, retry = limiter.hit("198.51.100.2", 100, now=NOW, cost=0)
+    assert not ok and retry > 0
+    print("  >>> PASS: weighted hits (byte budgets)")
+
+
+def test_bounded_memory():
+    limiter = SharedRateLimiter("bounded", WINDOW, shards=4, slots_per_shard=32)
+    for i in range(5000):
+        limiter.hit(f"10.0.{i // 256}.{i % 256}", 10, now=NOW)
+    size = os.path.getsize(limiter.path)
+    assert size == limiter.size, f"file grew to {size} bytes"
+    assert limiter.hit("192.0.2.55", 10, now=NOW)[0]
+    print(f"  >>> PASS: 5000 IPs kept in {size} bytes")
+
+
+def test_forwarded_for():
+    app = Flask(__name__)
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+    @app.route("/")
+    def ip():
+        return request.remote_addr
+
+    client = app.test_client()
+    proxied = {"REMOTE_ADDR": "127.0.0.1"}
+    r = client.get("/", headers={"X-Forwarded-For": "6.6.6.6, 198.51.100.9"},
+                   environ_base=proxied)
+    assert r.text == "198.51.100.9", r.text
+    r = client.get("/", environ_base=proxied)
+    assert r.text == "127.0.0.1", r.text
+    print("  >>> PASS: X-Forwarded-For resolves to the hop the proxy appended")
+
+
+def main():
+    test_shared_across_processes()
+    test_sliding_window()
+    test_cost()
+    test_bounded_memory()
+    test_forwarded_for()
+    print("\n[+] All tests passed.")
+
+
+if __name__ == "__main__":
+    main()
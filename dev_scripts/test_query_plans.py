@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+# Query-plan regression test: runs every query issued by the Fit DB layer,
+# the rate limiter, the verify worker and index_server.db.users through
+# EXPLAIN against a realistically sized seeded database, and fails unless
+# each one is served by the index it was written for (EXPECTED_INDEXES).
+# Planner settings are left alone, so the plan checked is the one Postgres
+# would pick; a statement that reads a table without an expectation, or
+# seq-scans anything but a lookup table, fails too.
+#
+# Needs DATABASE_URL (submissions DB) and AUTH_DATABASE_URL (auth DB) pointing
+# at local databases with the schema and all migrations applied. All seed data
+# is written inside a transaction that is rolled back at the end.
+#
+#   python dev_scripts/test_query_plans.py
+import os
+import re
+import sys
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(ROOT, ".env"))
+except ImportError:
+    pass
+
+import psycopg2
+from werkzeug.security import generate_password_hash
+
+import clients.fit.db.queue as fit_queue
+import clients.fit.db.submissions as fit_submissions
+import clients.fit.db.thumbnails as thumbnails
+import clients.fit.verify_worker as verify_worker
+import index_server.db.users as index_users
+import shared.rate_limit as rate_limit
+from auth_server.db.connection import get_auth_connection
+from clients.fit.db.packing import pack_squares
+from shared.db import get_connection
+
+SQ = 56
+SEED_USER_ID = 1
+SEED_USERS = 500
+SEED_SUBMISSIONS = 50_000
+SEED_AUTH_USERS = 20_000
+EXPLORE_CURSOR = {"k": [3.05, "2026-01-01T00:00:00", 1], "p": 2}
+HISTORY_CURSOR = {"k": ["2026-01-01T00:00:00", 1], "p": 2}
+
+# Below this many rows (after ANALYZE) a seq scan is the right plan: lookup
+# tables such as problem_instances, and partitions outside the seeded range
+SMALL_TABLE_ROWS = 1000
+
+# (regex on the statement, indexes that must serve it). The first match
+# applies. Names are of the parent index; partition indexes match through it.
+EXPECTED_INDEXES = [
+    # clients.fit.db.submissions
+    (r"^EXECUTE fit_submission_set_rank", {"submissions_pkey"}),
+    (r"^EXECUTE fit_(instance_lookup|submission_insert|duplicate_rank)", set()),
+    (r"FROM fit_leaderboard_counts", set()),
+    (r"FROM fit_leaderboard WHERE square_count = %s AND \(is_duplicate",
+     {"fit_leaderboard_unique_idx"}),
+    (r"FROM fit_leaderboard WHERE square_count = %s", {"fit_leaderboard_pkey"}),
+    (r"FROM validation_runs WHERE submission_id = s\.id",
+     {"submissions_pkey", "validation_runs_submission_idx"}),
+    (r"FROM submissions WHERE (id = %s|id = ANY)", {"submissions_pkey"}),
+    (r"FROM submission_squares WHERE", {"submission_squares_pkey"}),
+    (r"FROM submissions WHERE square_count = %s AND status = %s AND id > %s",
+     {"submissions_export_idx"}),
+    # clients.fit.db.queue
+    (r"^EXECUTE fit_queue_stats", {"submissions_pending_idx"}),
+    (r"^EXECUTE fit_leaderboard_latency", {"fit_leaderboard_listed_idx"}),
+    # clients.fit.verify_worker
+    (r"FROM fit_leaderboard_counts c CROSS JOIN LATERAL", {"fit_leaderboard_pkey"}),
+    (r"WITH candidates AS MATERIALIZED",
+     {"submissions_pending_record_idx"}),
+    (r"AND s\.status = 'pending' ORDER BY s\.created_at", {"submissions_pending_idx"}),
+    (r"^INSERT INTO validation_runs", set()),
+    (r"^UPDATE submissions SET", {"submissions_pkey"}),
+    (r"^INSERT INTO (fit_leaderboard|submission_thumbnails)", set()),
+    # clients.fit.db.thumbnails
+    (r"FROM submission_thumbnails WHERE submission_id", {"submission_thumbnails_pkey"}),
+    # shared.rate_limit
+    (r"^EXECUTE rate_limit_(window|record)", {"rate_limit_buckets_pkey"}),
+    # index_server.db.users
+    (r"FROM submissions WHERE user_id = %s", {"submissions_user_created_idx"}),
+    (r"FROM submissions s JOIN problem_instances pi ON s\.instance_id = pi\.id "
+     r"WHERE s\.user_id", {"submissions_user_created_idx"}),
+    (r"FROM users WHERE LOWER\(username\)",
+     {"users_lower_username_idx", "users_lower_email_idx"}),
+    (r"(FROM users WHERE id|^UPDATE users SET)", {"users_pkey"}),
+]
+
+
+class _ExplainingCursor:
+    """Cursor proxy that EXPLAINs each statement before executing it."""
+
+    def __init__(self, cur, plans, label):
+        self._cur = cur
+        self._plans = plans
+        self._label = label
+
+    def execute(self, sql, params=None):
+        if sql.lstrip().upper().startswith("PREPARE"):
+            return self._cur.execute(sql, params)
+        self._cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = self._cur.fetchone()["QUERY PLAN"]
+        self._plans.append((self._label, " ".join(sql.split()), plan))
+        return self._cur.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+def _explaining_cursor_factory(conn, plans, label):
+    @contextmanager
+    def factory(commit=True):
+        cur = conn.cursor()
+        try:
+            yield conn, _ExplainingCursor(cur, plans, label)
+        finally:
+            cur.close()
+    return factory
+
+
+# Returns (relations read, index names used, seq-scanned relations)
+def _plan_access(node):
+    relations, indexes, seq = set(), set(), set()
+    if "Relation Name" in node and node.get("Node Type") != "ModifyTable":
+        relations.add(node["Relation Name"])
+    if "Index Name" in node:
+        indexes.add(node["Index Name"])
+    if node.get("Node Type") == "Seq Scan":
+        seq.add(node.get("Relation Name"))
+    for child in node.get("Plans", []):
+        r, i, s = _plan_access(child)
+        relations |= r
+        indexes |= i
+        seq |= s
+    return relations, indexes, seq
+
+
+# Returns ({parent index: itself and its partition indexes}, names of tables
+# with fewer than SMALL_TABLE_ROWS rows)
+def _catalog(conn):
+    families = {}
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT c.relname AS name, p.relname AS parent
+            FROM pg_class c
+            LEFT JOIN pg_inherits i ON i.inhrelid = c.oid
+            LEFT JOIN pg_class p ON p.oid = i.inhparent
+            WHERE c.relkind IN ('i', 'I')
+            """
+        )
+        parents = {row["name"]: row["parent"] for row in cur.fetchall()}
+        cur.execute(
+            "SELECT relname FROM pg_class WHERE relkind = 'r' AND reltuples < %s",
+            (SMALL_TABLE_ROWS,),
+        )
+        small = {row["relname"] for row in cur.fetchall()}
+    for name in parents:
+        root = name
+        while parents.get(root):
+            root = parents[root]
+        families.setdefault(root, set()).add(name)
+    return families, small
+
+
+def _line_squares(n):
+    return [
+        {"cx": idx * SQ, "cy": 0.0, "ux": 1.0, "uy": 0.0,
+         "cx_q": idx * SQ * 10**9, "cy_q": 0, "ux_q": 10**9, "uy_q": 0}
+        for idx in range(n)
+    ]
+
+
+def _grid_payload(n, offset):
+    squares = []
+    for i in range(n):
+        px, py = (i % 4) * SQ, (i // 4) * SQ + offset
+        squares.append([
+            {"x": px, "y": py},
+            {"x": px + SQ, "y": py},
+            {"x": px + SQ, "y": py + SQ},
+            {"x": px, "y": py + SQ},
+        ])
+    return squares
+
+
+# Submissions over two partitions (n 11-40 and 64-93), 500 users and a year
+# of history: mostly valid, 10% invalid, 2% pending, 1% in the legacy
+# submission_squares layout, most sharing their bounds with an earlier one;
+# plus the tables derived from them
+def _seed_submissions(cur):
+    cur.execute(
+        """
+        INSERT INTO problem_instances
+            (domain, n, square_size, container_type, allow_rotation, quant_scale)
+        VALUES ('square_packing_rotatable', 0, 56, 'square', true, 1000000000)
+        RETURNING id
+        """
+    )
+    instance_id = cur.fetchone()["id"]
+    square_counts = list(range(11, 41)) + list(range(64, 94))
+    packed = [None] * 93
+    for n in square_counts:
+        packed[n - 1] = psycopg2.Binary(pack_squares(_line_squares(n)))
+    cur.execute(
+        """
+        INSERT INTO submissions
+            (instance_id, user_id, status, objective_value, solution_hash,
+             square_count, squares_packed, pre_validated, created_at)
+        SELECT %s, 1 + g %% %s,
+               CASE WHEN g %% 50 = 0 THEN 'pending'
+                    WHEN g %% 10 = 1 THEN 'invalid'
+                    ELSE 'valid' END,
+               3.0 + (g %% 97) / 100.0,
+               decode(md5(g::text), 'hex'),
+               n,
+               CASE WHEN g %% 100 = 3 THEN NULL ELSE (%s::bytea[])[n] END,
+               g %% 2 = 0,
+               NOW() - make_interval(mins => g * 10)
+        FROM generate_series(1, %s) g
+        CROSS JOIN LATERAL (
+            SELECT CASE WHEN g %% 10 = 0 THEN 64 + g / 10 %% 30 ELSE 11 + g / 7 %% 30 END AS n
+        ) sc
+        """,
+        (instance_id, SEED_USERS, packed, SEED_SUBMISSIONS),
+    )
+    cur.execute(
+        """
+        UPDATE submissions s
+        SET is_duplicate = true, duplicate_number = r.rank
+        FROM (
+            SELECT id, square_count,
+                   row_number() OVER (
+                       PARTITION BY instance_id, square_count, objective_value ORDER BY id
+                   ) AS rank
+            FROM submissions
+        ) r
+        WHERE s.id = r.id AND s.square_count = r.square_count AND r.rank > 1
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO submission_squares
+            (submission_id, idx, cx, cy, ux, uy, cx_q, cy_q, ux_q, uy_q, pinned)
+        SELECT s.id, i, i * 56.0, 0, 1, 0, i * 56000000000::bigint, 0, 1000000000, 0, false
+        FROM submissions s
+        CROSS JOIN LATERAL generate_series(0, s.square_count - 1) i
+        WHERE s.squares_packed IS NULL
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO validation_runs (submission_id, validator_ver, valid, reason, metrics)
+        SELECT id, 'fit-v2.0', status = 'valid', 'seed', '{}'
+        FROM submissions
+        WHERE status <> 'pending'
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO fit_leaderboard
+            (square_count, objective_value, created_at, submission_id, user_id,
+             min_slack, is_duplicate, duplicate_number, listed_at)
+        SELECT square_count, objective_value, created_at, id, user_id,
+               min_slack, is_duplicate, duplicate_number,
+               created_at + INTERVAL '1 minute'
+        FROM submissions
+        WHERE status = 'valid'
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO fit_leaderboard_counts (square_count, submission_count, unique_count)
+        SELECT square_count, COUNT(*),
+               COUNT(*) FILTER (WHERE is_duplicate = false OR duplicate_number = 1)
+        FROM fit_leaderboard
+        GROUP BY square_count
+        ON CONFLICT (square_count) DO UPDATE
+        SET submission_count = EXCLUDED.submission_count,
+            unique_count = EXCLUDED.unique_count
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO fit_duplicate_counts
+            (instance_id, square_count, objective_value, submission_count)
+        SELECT instance_id, square_count, objective_value, COUNT(*)
+        FROM submissions
+        GROUP BY instance_id, square_count, objective_value
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO submission_thumbnails (submission_id, svg)
+        SELECT submission_id, '<svg/>'
+        FROM fit_leaderboard
+        WHERE submission_id % 5 = 0
+        ON CONFLICT (submission_id) DO NOTHING
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO rate_limit_buckets (user_id, bucket_start, count)
+        SELECT u, date_trunc('minute', NOW()) - make_interval(mins => m), 1
+        FROM generate_series(1, %s) u
+        CROSS JOIN generate_series(0, 119) m
+        ON CONFLICT (user_id, bucket_start) DO NOTHING
+        """,
+        (SEED_USERS,),
+    )
+    for table in (
+        "problem_instances", "submissions", "submission_squares", "validation_runs",
+        "fit_leaderboard", "fit_leaderboard_counts", "fit_duplicate_counts",
+        "submission_thumbnails", "rate_limit_buckets",
+    ):
+        cur.execute(f"ANALYZE {table}")
+
+    cur.execute(
+        """
+        SELECT DISTINCT ON (squares_packed IS NULL) id, square_count
+        FROM submissions
+        WHERE instance_id = %s AND status = 'valid'
+        ORDER BY squares_packed IS NULL, id
+        """,
+        (instance_id,),
+    )
+    packed_row, legacy_row = cur.fetchall()
+    return packed_row, legacy_row
+
+
+def _seed_auth(cur):
+    cur.execute(
+        """
+        INSERT INTO users (username, email, display_name)
+        SELECT 'seed' || g, 'seed' || g || '@example.com', 'seed' || g
+        FROM generate_series(1, %s) g
+        """,
+        (SEED_AUTH_USERS,),
+    )
+    cur.execute(
+        """
+        INSERT INTO users (username, email, display_name, password_hash)
+        VALUES ('planuser', 'planuser@example.com', 'planuser', %s)
+        RETURNING id
+        """,
+        (generate_password_hash("plan-password", method="pbkdf2:sha256"),),
+    )
+    user_id = cur.fetchone()["id"]
+    cur.execute("ANALYZE users")
+    return user_id
+
+
+def _run_submissions_db(conn, plans):
+    with conn.cursor() as cur:
+        packed_row, legacy_row = _seed_submissions(cur)
+
+    def use(module, label):
+        module.get_cursor = _explaining_cursor_factory(conn, plans, label)
+
+    use(fit_submissions, "clients.fit.db.submissions")
+    fit_submissions.get_or_create_fit_instance()
+    new_id, err = fit_submissions.create_fit_submission(
+        SEED_USER_ID, _grid_payload(11, 10_000)
+    )
+    assert err is None, f"create_fit_submission failed: {err}"
+    fit_submissions.create_fit_submission(SEED_USER_ID, _grid_payload(11, 20_000))
+    _, err = fit_submissions.create_fit_submission(SEED_USER_ID, _grid_payload(11, 10_000))
+    assert err and "identical" in err, f"resubmit was not rejected: {err}"
+    async_id, err = fit_submissions.create_fit_submission(
+        SEED_USER_ID, _grid_payload(11, 30_000), pre_validate=False
+    )
+    assert err is None, f"async create_fit_submission failed: {err}"
+    assert fit_submissions.get_submission_status(async_id)["duplicate_number"] is None
+    fit_submissions.get_available_square_counts()
+    fit_submissions.get_best_submissions(11)
+    fit_submissions.get_best_submissions(11, hide_duplicates=True, cursor=EXPLORE_CURSOR)
+    fit_submissions.get_best_submissions(11, cursor={**EXPLORE_CURSOR, "b": True})
+    fit_submissions.get_top_valid_ids(11)
+    packed_id, legacy_id = packed_row["id"], legacy_row["id"]
+    packed_n, legacy_n = packed_row["square_count"], legacy_row["square_count"]
+    assert len(fit_submissions.get_submission_squares(packed_id)) == packed_n
+    assert len(fit_submissions.get_submission_squares(legacy_id, legacy_n)) == legacy_n
+    batch = fit_submissions.get_submissions_geometry([packed_id, legacy_id])
+    assert len(batch[packed_id]["squares"]) == packed_n
+    assert len(batch[legacy_id]["squares"]) == legacy_n
+    fit_submissions.get_submissions_geometry([packed_id], square_count=packed_n)
+    # The export runs on a named cursor, which EXPLAIN cannot wrap; check
+    # its SQL directly, once from the start and once resumed near the end
+    with conn.cursor() as cur:
+        explain = _ExplainingCursor(cur, plans, "clients.fit.db.submissions (export)")
+        explain.execute(fit_submissions._EXPORT_SQL, (11, "valid", 0))
+        explain.execute(fit_submissions._EXPORT_SQL, (11, "valid", SEED_SUBMISSIONS - 500))
+    exported = list(fit_submissions.iter_submissions_for_export(11, "valid"))
+    assert exported and all(len(row["squares"]) == 11 for row in exported)
+
+    use(fit_queue, "clients.fit.db.queue")
+    fit_queue.QUEUE_CHECK_SECONDS = 0
+    assert fit_queue.get_queue_stats().pending >= 1
+    fit_queue.get_leaderboard_latency()
+
+    use(verify_worker, "clients.fit.verify_worker")
+    verify_worker.fetch_pending()
+    best = verify_worker.best_objectives()
+    with conn.cursor() as cur:
+        cur.execute("SELECT MIN(objective_value) AS best FROM fit_leaderboard WHERE square_count = 11")
+        assert best[11] == cur.fetchone()["best"], best
+    verify_worker.fetch_pending(best=best)
+    # With a boost longer than the seeded history, the pre-validated grids
+    # submitted above (the only pending n=11 rows) are claimed first
+    verify_worker.PRIORITY_BOOST_SECONDS = 2 * 365 * 86400
+    claimed = verify_worker.fetch_pending(limit=3, best={11: 10.0})
+    assert [row["id"] for row in claimed[:2]] == [new_id, new_id + 1], claimed
+    assert [row["is_record"] for row in claimed] == [True, True, False], claimed
+    new_squares = verify_worker.fetch_squares(new_id)
+    verify_worker.fetch_squares(legacy_id)
+    verify_worker.record_result(
+        new_id, True, "ok", {"computed_objective": 3.0}, 3.0, squares=new_squares
+    )
+    # Same bounds as the two pre-validated grids above: ranked third once valid
+    row = verify_worker.record_result(
+        async_id, True, "ok", {"computed_objective": 4.0}, 4.0, 11
+    )
+    assert row["duplicate_number"] == 3, row
+
+    use(thumbnails, "clients.fit.db.thumbnails")
+    assert thumbnails.get_thumbnail(new_id).startswith("<svg")
+
+    use(rate_limit, "shared.rate_limit")
+    rate_limit.check_rate_limit(SEED_USER_ID)
+
+    use(index_users, "index_server.db.users")
+    index_users.get_user_submissions(SEED_USER_ID)
+    index_users.get_user_submissions(SEED_USER_ID, cursor=HISTORY_CURSOR)
+    return _catalog(conn)
+
+
+def _run_auth_db(conn, plans):
+    with conn.cursor() as cur:
+        user_id = _seed_auth(cur)
+
+    factory = _explaining_cursor_factory(conn, plans, "index_server.db.users (auth)")
+    index_users._get_auth_cursor = factory
+    token, _ = index_users._login_user_direct("PlanUser", "plan-password")
+    assert token, "direct login failed"
+    index_users._get_user_by_id_direct(user_id)
+    index_users._update_user_email_direct(user_id, "planuser2@example.com")
+    index_users._update_user_password_direct(
+        user_id, "plan-password", "plan-password-2"
+    )
+    return _catalog(conn)
+
+
+# Returns an error string for one explained statement, or None
+def _check_plan(sql, plan, families, small):
+    relations, used, seq = _plan_access(plan[0]["Plan"])
+    seq -= small
+    if seq:
+        return f"seq scan on {', '.join(sorted(seq))}"
+    for pattern, expected in EXPECTED_INDEXES:
+        if re.search(pattern, sql):
+            break
+    else:
+        if relations - small:
+            return f"reads {', '.join(sorted(relations))} but has no expected index"
+        return None
+    if not expected:
+        return None
+    allowed = set()
+    for name in expected:
+        allowed |= families.get(name, {name})
+    if not used & allowed:
+        return (
+            f"expected {', '.join(sorted(expected))}, "
+            f"used {', '.join(sorted(used)) or 'no index'}"
+        )
+    return None
+
+
+def main():
+    plans = []
+    families, small = {}, set()
+    for connect, run in (
+        (get_connection, _run_submissions_db),
+        (get_auth_connection, _run_auth_db),
+    ):
+        conn = connect()
+        try:
+            db_families, db_small = run(conn, plans)
+            families.update(db_families)
+            small |= db_small
+        finally:
+            conn.rollback()
+            conn.close()
+
+    failures = 0
+    for label, sql, plan in plans:
+        error = _check_plan(sql, plan, families, small)
+        if error:
+            failures += 1
+            print(f"  FAIL [{label}] {error}")
+            print(f"       {sql[:160]}")
+    print(f"\n  {len(plans)} statement(s) explained, {failures} not served as expected")
+    assert failures == 0, "query plans do not use the expected indexes"
+    print("[+] All tests passed.")
+
+
+if __name__ == "__main__":
+    main()
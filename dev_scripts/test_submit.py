@@ -38,14 +38,17 @@ def get_token():
     return token
 
 
-def submit(token, squares, label):
+def submit(token, squares, label, async_mode=False):
     print(f"\n{'='*60}")
     print(f"  {label}  ({len(squares)} squares)")
     print(f"{'='*60}")
+    headers = {"Authorization": f"Bearer {token}"}
+    if async_mode:
+        headers["Prefer"] = "respond-async"
     r = requests.post(
         f"{BASE}/api/fit/submit",
         json={"squares": squares},
-        headers={"Authorization": f"Bearer {token}"},
+        headers=headers,
     )
     print(f"  Status : {r.status_code}")
     body = r.json()
@@ -92,6 +95,12 @@ def main():
     assert code == 422, f"Expected 422, got {code}"
     print("  >>> PASS: rejected as expected")
 
+    # --- Out of range: quantized coordinates would not fit in int64 ---
+    far_squares = valid_squares[:-1] + [make_square(1e10, 0)]
+    code = submit(token, far_squares, "TEST 3: Coordinate out of range (async)", async_mode=True)
+    assert code == 422, f"Expected 422, got {code}"
+    print("  >>> PASS: rejected as expected")
+
     print("\n[+] All tests passed.")
 
 
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# Checks the async submit mode and the status event stream without a
+# database: async is opt-in via Prefer or ?async=1 and answers 202 with the
+# status URLs, the SSE generator ends on a final status, on a missed NOTIFY
+# (by re-reading the row) and on timeout, and the LISTEN fan-out keeps one
+# subscription per id across several waiters.
+#
+#   python dev_scripts/test_submit_events.py
+import json
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from flask import Flask
+
+import clients.fit.api as api
+import clients.fit.events as events
+from clients.fit import fit_bp
+from clients.fit.db.submissions import status_payload
+from shared.notify import Listener
+
+SQUARES = [[{"x": 0, "y": 0}, {"x": 56, "y": 0}, {"x": 56, "y": 56}, {"x": 0, "y": 56}]] * 11
+
+
+class _OfflineListener(Listener):
+    """Listener that never opens a connection; messages come via _dispatch."""
+
+    def _ensure_thread(self):
+        pass
+
+
+def _status(sid, status, reason=None):
+    row = {"id": sid, "status": status, "square_count": 11,
+           "objective_value": 3.5, "duplicate_number": None}
+    return status_payload(row, reason)
+
+
+def _app():
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(fit_bp)
+    return app
+
+
+def _events(body):
+    return [json.loads(line[len("data: "):])
+            for line in body.splitlines() if line.startswith("data: ")]
+
+
+def test_wants_async():
+    app = _app()
+    cases = [
+        ({}, "", False),
+        ({"Prefer": "respond-async"}, "", True),
+        ({"Prefer": "wait=10, Respond-Async"}, "", True),
+        ({"Prefer": "return=minimal"}, "", False),
+        ({}, "?async=1", True),
+        ({}, "?async=true", True),
+        ({}, "?async=0", False),
+    ]
+    for headers, query, expected in cases:
+        with app.test_request_context("/api/fit/submit" + query, headers=headers):
+            assert api._wants_async() is expected, (headers, query)
+    print("  >>> PASS: async mode from Prefer header and ?async=1")
+
+
+def test_submit_202():
+    calls = []
+    api.create_fit_submission = lambda user_id, squares, pre_validate=True: (
+        calls.append(pre_validate) or (42, None)
+    )
+    api.get_optimal_n = lambda: set()
+    api.get_queue_stats = lambda: None
+    api._check_ip_rate = lambda ip, is_authenticated: (True, 0)
+    client = _app().test_client()
+
+    r = client.post("/api/fit/submit", json={"squares": SQUARES},
+                    headers={"Prefer": "respond-async"})
+    assert r.status_code == 202, r.status_code
+    body = r.get_json()
+    assert body["submission_id"] == 42 and body["status"] == "pending"
+    assert body["status_url"] == "/api/fit/submission/42/status"
+    assert body["events_url"] == "/api/fit/submission/42/events"
+    assert r.headers["Location"] == body["status_url"]
+    assert r.headers["Preference-Applied"] == "respond-async"
+
+    r = client.post("/api/fit/submit", json={"squares": SQUARES})
+    assert r.status_code == 200 and "status_url" not in r.get_json()
+    assert calls == [False, True], calls
+    print("  >>> PASS: 202 with status/events URLs; pre-validation only when sync")
+
+
+def test_status_events():
+    events.EVENTS_KEEPALIVE_SECONDS = 0.05
+    listener = _OfflineListener("test")
+
+    # Already final: one event and done
+    sub = listener.subscribe(1)
+    out = list(events._status_events(1, _status(1, "invalid", "overlap"), sub))
+    assert [e["status"] for e in _events("".join(out))] == ["invalid"]
+    listener.unsubscribe(1, sub)
+
+    # Pushed result ends the stream
+    events.get_submission_status = lambda sid: _status(sid, "pending")
+    sub = listener.subscribe(2)
+    threading.Timer(0.02, listener._dispatch,
+                    (json.dumps(_status(2, "valid", "All checks passed.")),)).start()
+    out = "".join(events._status_events(2, _status(2, "pending"), sub))
+    assert [e["status"] for e in _events(out)] == ["pending", "valid"], out
+    listener.unsubscribe(2, sub)
+
+    # Missed NOTIFY: the keepalive tick re-reads the row
+    reads = []
+    events.get_submission_status = lambda sid: (
+        reads.append(sid) or _status(sid, "valid" if len(reads) > 2 else "pending")
+    )
+    sub = listener.subscribe(3)
+    out = "".join(events._status_events(3, _status(3, "pending"), sub))
+    assert [e["status"] for e in _events(out)] == ["pending", "valid"], out
+    assert out.count(": keepalive") == 2, out
+    listener.unsubscribe(3, sub)
+
+    # Still pending at the deadline: keepalives, then the stream ends
+    events.EVENTS_TIMEOUT_SECONDS = 0.2
+    events.get_submission_status = lambda sid: _status(sid, "pending")
+    sub = listener.subscribe(4)
+    t0 = time.monotonic()
+    out = "".join(events._status_events(4, _status(4, "pending"), sub))
+    assert time.monotonic() - t0 < 1
+    assert [e["status"] for e in _events(out)] == ["pending"], out
+    assert ": keepalive" in out
+    listener.unsubscribe(4, sub)
+    assert listener._subs == {}
+    print("  >>> PASS: stream ends on final status, missed notify, and timeout")
+
+
+def test_listener_bookkeeping():
+    listener = _OfflineListener("test")
+    a = listener.subscribe(7)
+    b = listener.subscribe(7)
+    other = listener.subscribe(8)
+    assert a is b and a.waiters == 2 and len(listener._subs) == 2
+
+    results = []
+    waiters = [threading.Thread(target=lambda: results.append(a.wait(1))) for _ in range(2)]
+    for t in waiters:
+        t.start()
+    listener._dispatch("not json")
+    listener._dispatch(json.dumps({"status": "valid"}))
+    listener._dispatch(json.dumps({"id": 9, "status": "valid"}))
+    listener._dispatch(json.dumps({"id": 7, "status": "valid"}))
+    for t in waiters:
+        t.join()
+    assert [r["id"] for r in results] == [7, 7], results
+    assert other.wait(0.01) is None
+
+    listener.unsubscribe(7, a)
+    assert 7 in listener._subs
+    listener.unsubscribe(7, b)
+    listener.unsubscribe(8, other)
+    assert listener._subs == {}
+    print("  >>> PASS: fan-out to every waiter; subscriptions freed with the last one")
+
+
+def main():
+    test_wants_async()
+    test_submit_202()
+    test_status_events()
+    test_listener_bookkeeping()
+    print("\n[+] All tests passed.")
+
+
+if __name__ == "__main__":
+    main()
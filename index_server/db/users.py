@@ -3,7 +3,9 @@ from datetime import datetime
 
 import requests
 
+from shared.auth_client import auth_request
 from shared.db import get_cursor
+from shared.pagination import keyset_page
 
 
 def _coerce_user_created_at(user):
@@ -30,7 +32,7 @@ AUTH_SERVER_URL = os.environ.get("AUTH_SERVER_URL", "").rstrip("/")
 
 def _auth_post(path, payload):
     try:
-        r = requests.post(f"{AUTH_SERVER_URL}{path}", json=payload, timeout=5)
+        r = auth_request("POST", path, json=payload)
         return r.json(), r.status_code
     except (requests.RequestException, ValueError):
         return {"error": "Auth server unreachable."}, 503
@@ -38,10 +40,8 @@ def _auth_post(path, payload):
 
 def _auth_get(path, token):
     try:
-        r = requests.get(
-            f"{AUTH_SERVER_URL}{path}",
-            headers={"Authorization": f"Bearer {token}"},
-            timeout=5,
+        r = auth_request(
+            "GET", path, headers={"Authorization": f"Bearer {token}"},
         )
         return r.json(), r.status_code
     except (requests.RequestException, ValueError):
@@ -50,11 +50,9 @@ def _auth_get(path, token):
 
 def _auth_put(path, token, payload):
     try:
-        r = requests.put(
-            f"{AUTH_SERVER_URL}{path}",
-            json=payload,
+        r = auth_request(
+            "PUT", path, json=payload,
             headers={"Authorization": f"Bearer {token}"},
-            timeout=5,
         )
         return r.json(), r.status_code
     except (requests.RequestException, ValueError):
@@ -120,31 +118,62 @@ def update_user_password(user_id, current_password, new_password, token=None):
     return False, data.get("error", "Failed to update password.")
 
 
-def get_user_submissions(user_id, page=1, per_page=50):
-    offset = (page - 1) * per_page
+def _history_key(row):
+    return [row["created_at"].isoformat(), row["id"]]
+
+
+# Validated (created_at, id) from a page cursor, or None
+def _history_cursor_key(cursor):
+    if not cursor or len(cursor["k"]) != 2:
+        return None
+    created_at, sid = cursor["k"]
+    if not isinstance(sid, int):
+        return None
+    try:
+        return datetime.fromisoformat(created_at), sid
+    except (TypeError, ValueError):
+        return None
+
+
+# Newest first, keyset-paginated on (created_at, id); returns (rows, page_info).
+# The total is counted on the first page and carried in the cursor afterwards.
+def get_user_submissions(user_id, per_page=50, cursor=None):
+    cursor_key = _history_cursor_key(cursor)
+    if cursor_key is None:
+        cursor = None
+
+    key_filter = ""
+    order = "DESC"
+    params = [user_id]
+    if cursor:
+        backward = bool(cursor.get("b"))
+        key_filter = "AND (s.created_at, s.id) " + ("> (%s, %s)" if backward else "< (%s, %s)")
+        order = "ASC" if backward else "DESC"
+        params.extend(cursor_key)
+    params.append(per_page + 1)
+
     with get_cursor() as (conn, cur):
+        total = cursor.get("t") if cursor else None
+        if not isinstance(total, int):
+            cur.execute(
+                "SELECT COUNT(*) AS cnt FROM submissions WHERE user_id = %s",
+                (user_id,),
+            )
+            total = cur.fetchone()["cnt"]
         cur.execute(
-            "SELECT COUNT(*) AS cnt FROM submissions WHERE user_id = %s",
-            (user_id,),
-        )
-        total = cur.fetchone()["cnt"]
-        cur.execute(
-            """
+            f"""
             SELECT s.id, s.status, s.objective_value, s.min_slack, s.created_at,
-                   pi.domain,
-                   COUNT(ss.idx) as square_count
+                   pi.domain, s.square_count
             FROM submissions s
             JOIN problem_instances pi ON s.instance_id = pi.id
-            LEFT JOIN submission_squares ss ON s.id = ss.submission_id
             WHERE s.user_id = %s
-            GROUP BY s.id, s.status, s.objective_value, s.min_slack, s.created_at,
-                     pi.domain
-            ORDER BY s.created_at DESC
-            LIMIT %s OFFSET %s
+              {key_filter}
+            ORDER BY s.created_at {order}, s.id {order}
+            LIMIT %s
             """,
-            (user_id, per_page, offset),
+            params,
         )
-        return cur.fetchall(), total
+        return keyset_page(cur.fetchall(), per_page, cursor, _history_key, total)
 
 
 def _get_auth_cursor():
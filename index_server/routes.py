@@ -1,4 +1,4 @@
-from flask import redirect, render_template, request, session, url_for
+from flask import jsonify, redirect, render_template, request, session, url_for
 
 from index_server import index_bp
 from index_server.db.users import (
@@ -9,6 +9,9 @@ from index_server.db.users import (
     update_user_email,
     update_user_password,
 )
+from shared.auth_client import auth_breaker_state, auth_client_stats
+from shared.pagination import decode_cursor
+from shared.users import username_cache_stats
 
 
 @index_bp.route("/")
@@ -16,6 +19,17 @@ def home():
     return render_template("index/home.html")
 
 
+# Monitoring: auth-server breaker state and client-side cache/pool metrics
+@index_bp.route("/health")
+def health():
+    return jsonify(
+        status="ok",
+        auth_breaker=auth_breaker_state(),
+        auth_client=auth_client_stats(),
+        username_cache=username_cache_stats(),
+    )
+
+
 @index_bp.route("/about")
 def about():
     return render_template("index/about.html")
@@ -75,14 +89,18 @@ def submissions():
     is_guest = session.get("is_guest", False)
     if not user_id or is_guest:
         return redirect(url_for("index.login"))
-    page = request.args.get("page", 1, type=int)
+    cursor = decode_cursor(request.args.get("cursor"))
     per_page = 50
-    submissions_list, total = get_user_submissions(user_id, page=page, per_page=per_page)
+    submissions_list, page_info = get_user_submissions(
+        user_id, per_page=per_page, cursor=cursor,
+    )
+    total = page_info["total"]
     total_pages = max(1, (total + per_page - 1) // per_page)
     return render_template(
         "index/submissions.html",
         submissions=submissions_list,
-        page=page,
+        page=page_info["page"],
+        page_info=page_info,
         total_pages=total_pages,
         total=total,
     )
@@ -1,9 +1,13 @@
 import os
 from dotenv import load_dotenv
 from flask import Flask, session
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 load_dotenv()
 
+# Reverse proxies in front of the app; each appends one X-Forwarded-For hop
+TRUSTED_PROXY_COUNT = int(os.environ.get("TRUSTED_PROXY_COUNT", 1))
+
 
 def create_app():
     app = Flask(
@@ -12,6 +16,12 @@ def create_app():
         static_folder="static",
     )
     app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret-change-in-production")
+    if TRUSTED_PROXY_COUNT:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
+
+    from shared.db import init_request_metrics
+
+    init_request_metrics(app)
 
     from index_server import index_bp
     from clients.fit import fit_bp
@@ -24,6 +34,10 @@ def create_app():
     init_session(app)
     app.register_blueprint(auth_bp)
 
+    from shared.compression import init_compression
+
+    init_compression(app)
+
     @app.context_processor
     def inject_user():
         return {
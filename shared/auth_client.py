@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+AUTH_SERVER_URL = os.environ.get("AUTH_SERVER_URL", "").rstrip("/")
+AUTH_HTTP_POOL_SIZE = int(os.environ.get("AUTH_HTTP_POOL_SIZE", 10))
+AUTH_CONNECT_TIMEOUT = float(os.environ.get("AUTH_CONNECT_TIMEOUT", 2))
+AUTH_READ_TIMEOUT = float(os.environ.get("AUTH_READ_TIMEOUT", 5))
+
+# Read timeouts for endpoints that should give up sooner than the default
+_ENDPOINT_READ_TIMEOUTS = {
+    "/auth/users/batch": float(os.environ.get("AUTH_BATCH_READ_TIMEOUT", 2)),
+}
+
+AUTH_BREAKER_FAILURES = int(os.environ.get("AUTH_BREAKER_FAILURES", 5))
+AUTH_BREAKER_RESET_SECONDS = float(os.environ.get("AUTH_BREAKER_RESET_SECONDS", 30))
+
+
+class AuthServerUnavailable(requests.RequestException):
+    """Raised without touching the network while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half_open (one probe) -> closed."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    # True if a call may go through; in half-open only one probe at a time
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "rejected": self.rejected,
+                "retry_in_seconds": retry_in,
+            }
+
+
+_breaker = CircuitBreaker(AUTH_BREAKER_FAILURES, AUTH_BREAKER_RESET_SECONDS)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_requests_sent = 0
+
+
+# One keep-alive session per process; created lazily so forked workers
+# never share sockets
+def _get_session():
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                # Calls carry bearer tokens; never keep cookies across users
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=AUTH_HTTP_POOL_SIZE,
+                    pool_block=True,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+                _session_pid = pid
+    return _session
+
+
+def _timeout_for(path):
+    for prefix, read in _ENDPOINT_READ_TIMEOUTS.items():
+        if path.startswith(prefix):
+            return (AUTH_CONNECT_TIMEOUT, read)
+    return (AUTH_CONNECT_TIMEOUT, AUTH_READ_TIMEOUT)
+
+
+# Sends a request to the auth server over the pooled session; raises
+# requests.RequestException on transport errors, or AuthServerUnavailable
+# immediately while the breaker is open. 5xx responses count as failures.
+def auth_request(method, path, **kwargs):
+    global _requests_sent
+    if not _breaker.allow():
+        raise AuthServerUnavailable("Auth server circuit breaker is open.")
+    kwargs.setdefault("timeout", _timeout_for(path))
+    with _stats_lock:
+        _requests_sent += 1
+    try:
+        resp = _get_session().request(method, f"{AUTH_SERVER_URL}{path}", **kwargs)
+    except Exception:
+        _breaker.record_failure()
+        raise
+    if resp.status_code >= 500:
+        _breaker.record_failure()
+    else:
+        _breaker.record_success()
+    return resp
+
+
+def auth_breaker_state():
+    return _breaker.snapshot()
+
+
+# Requests sent vs TCP connections opened to the auth server
+def auth_client_stats():
+    stats = {"requests": _requests_sent, "connections_opened": 0, "reuse_ratio": 0.0}
+    if _session is None:
+        return stats
+    pools = _session.get_adapter(AUTH_SERVER_URL or "http://").poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is not None:
+            stats["connections_opened"] += pool.num_connections
+    if _requests_sent:
+        stats["reuse_ratio"] = max(0.0, 1 - stats["connections_opened"] / _requests_sent)
+    return stats
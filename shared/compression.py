@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Negotiated gzip/brotli compression for a Flask app.
+
+Dynamic responses (JSON, HTML, ...) at least COMPRESS_MIN_BYTES long are
+compressed after the view runs. Static files are compressed once, at startup
+or with `python -m shared.compression`, into .gz/.br siblings which are then
+served as-is. Brotli is used only if the optional `brotli` package is
+installed.
+
+Compressed responses carry a weak ETag (W/"..."), so views must compare
+If-None-Match with contains_weak().
+"""
+import gzip
+import logging
+import mimetypes
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", 5))
+
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json",
+    "application/javascript",
+    "application/x-fit-squares-q+json",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+})
+STATIC_SUFFIXES = (".css", ".html", ".js", ".json", ".svg", ".txt")
+
+_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+log = logging.getLogger(__name__)
+
+
+def _encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+# Best encoding the client accepts, or None
+def _negotiate(accept_encodings):
+    for encoding in _encodings():
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def _compress(data, encoding, static=False):
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if static else COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if static else COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+# Writes .gz/.br next to each compressible file under `folder` whose copy is
+# missing or older than the source; returns the number of files written
+def precompress_static(folder):
+    written = 0
+    for dirpath, _dirs, files in os.walk(folder):
+        for name in files:
+            if not name.endswith(STATIC_SUFFIXES):
+                continue
+            path = os.path.join(dirpath, name)
+            mtime = os.stat(path).st_mtime
+            if os.path.getsize(path) < COMPRESS_MIN_BYTES:
+                continue
+            data = None
+            for encoding in _encodings():
+                target = path + _SUFFIX[encoding]
+                if os.path.exists(target) and os.stat(target).st_mtime >= mtime:
+                    continue
+                if data is None:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                tmp = f"{target}.{os.getpid()}.tmp"  # workers precompress concurrently
+                with open(tmp, "wb") as f:
+                    f.write(_compress(data, encoding, static=True))
+                os.replace(tmp, target)
+                written += 1
+    return written
+
+
+def _static_folders(app):
+    folders = {}
+    if app.static_folder:
+        folders["static"] = app.static_folder
+    for name, bp in app.blueprints.items():
+        if bp.static_folder:
+            folders[f"{name}.static"] = bp.static_folder
+    return folders
+
+
+# Installs compression on a Flask app; call after registering blueprints
+def init_compression(app):
+    from flask import request, send_file
+    from werkzeug.security import safe_join
+
+    static_folders = _static_folders(app)
+    for folder in static_folders.values():
+        try:
+            precompress_static(folder)
+        except OSError as exc:
+            log.warning("could not pre-compress %s: %s", folder, exc)
+
+    @app.before_request
+    def _serve_precompressed():
+        folder = static_folders.get(request.endpoint)
+        if folder is None or request.method not in ("GET", "HEAD"):
+            return None
+        encoding = _negotiate(request.accept_encodings)
+        if encoding is None:
+            return None
+        filename = (request.view_args or {}).get("filename", "")
+        path = safe_join(folder, filename)
+        if path is None or not os.path.isfile(path + _SUFFIX[encoding]):
+            return None
+        resp = send_file(
+            path + _SUFFIX[encoding],
+            mimetype=mimetypes.guess_type(path)[0],
+            conditional=True,
+            max_age=app.get_send_file_max_age(filename),
+        )
+        resp.headers["Content-Encoding"] = encoding
+        resp.vary.add("Accept-Encoding")
+        return resp
+
+    @app.after_request
+    def _compress_response(response):
+        if request.endpoint in static_folders:
+            response.vary.add("Accept-Encoding")
+            return response
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return response
+        encoding = _negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+        response.set_data(_compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+if __name__ == "__main__":
+    ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for folder in sys.argv[1:] or (
+        os.path.join(ROOT, "clients", "fit", "static"),
+        os.path.join(ROOT, "index_server", "static"),
+    ):
+        print(f"{folder}: {precompress_static(folder)} file(s) written")
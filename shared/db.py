@@ -1,19 +1,133 @@
+import contextvars
+import logging
 import os
+import threading
+import time
 import psycopg2
+from psycopg2.extensions import connection as _PgConnection
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 from contextlib import contextmanager
 
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+DB_SLOW_QUERY_MS = float(os.environ.get("DB_SLOW_QUERY_MS", 200))
+DB_REPEAT_THRESHOLD = int(os.environ.get("DB_REPEAT_THRESHOLD", 5))
+
+log = logging.getLogger(__name__)
+
+
+class RequestStats:
+    """SQL cost of one request: query count, DB time, pool wait, slowest statement."""
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_ms = 0.0
+        self.acquire_ms = 0.0
+        self.connections = 0
+        self.slowest_ms = 0.0
+        self.slowest_sql = None
+        self.statements = {}
+
+    def record(self, sql, ms):
+        self.query_count += 1
+        self.db_ms += ms
+        self.statements[sql] = self.statements.get(sql, 0) + 1
+        if ms > self.slowest_ms:
+            self.slowest_ms = ms
+            self.slowest_sql = sql
+
+    # Statements run at least `threshold` times in this request (likely N+1)
+    def repeated(self, threshold=None):
+        threshold = threshold or DB_REPEAT_THRESHOLD
+        return {sql: n for sql, n in self.statements.items() if n >= threshold}
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db_ms:.1f};desc="{self.query_count} queries", '
+            f'db-acquire;dur={self.acquire_ms:.1f};desc="{self.connections} connections", '
+            f"db-slowest;dur={self.slowest_ms:.1f}"
+        )
+
+
+_request_stats = contextvars.ContextVar("db_request_stats", default=None)
+
+
+class _TimedCursor(RealDictCursor):
+    def execute(self, query, vars=None):
+        stats = _request_stats.get()
+        if stats is None:
+            return super().execute(query, vars)
+        t0 = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            sql = " ".join(query.split()) if isinstance(query, str) else repr(query)
+            stats.record(sql, ms)
+            if ms >= DB_SLOW_QUERY_MS:
+                log.warning("slow query (%.1f ms): %s", ms, sql[:500])
+
+
+class PreparingConnection(_PgConnection):
+    """Connection that remembers which named statements it has PREPAREd."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def _database_url():
+    return os.environ.get("DATABASE_URL", "postgresql://localhost/extsearch_dev")
+
 
 def get_connection():
     return psycopg2.connect(
-        os.environ.get("DATABASE_URL", "postgresql://localhost/extsearch_dev"),
-        cursor_factory=RealDictCursor,
+        _database_url(),
+        cursor_factory=_TimedCursor,
+        connection_factory=PreparingConnection,
     )
 
 
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+
+# Pool is created lazily per process so gunicorn workers never share sockets
+def _get_pool():
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ThreadedConnectionPool(
+                    DB_POOL_MIN,
+                    DB_POOL_MAX,
+                    _database_url(),
+                    cursor_factory=_TimedCursor,
+                    connection_factory=PreparingConnection,
+                )
+                _pool_pid = pid
+    return _pool
+
+
 @contextmanager
 def get_cursor(commit=True):
-    conn = get_connection()
+    # Block instead of raising PoolError when every connection is checked out
+    t0 = time.perf_counter()
+    _pool_slots.acquire()
+    pool = _get_pool()
+    try:
+        conn = pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.acquire_ms += (time.perf_counter() - t0) * 1000
+        stats.connections += 1
     cur = conn.cursor()
     try:
         yield conn, cur
@@ -21,4 +135,70 @@ def get_cursor(commit=True):
             conn.commit()
     finally:
         cur.close()
-        conn.close()
+        broken = bool(conn.closed)
+        if not broken:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        pool.putconn(conn, close=broken)
+        _pool_slots.release()
+
+
+_statements = {}
+
+
+# Registers a statement (with $1..$n placeholders) to be PREPAREd per connection
+def register_statement(name, sql):
+    _statements[name] = sql
+
+
+# Runs a registered statement by name, preparing it on first use per connection
+def execute_prepared(cur, name, params=()):
+    conn = cur.connection
+    if name not in conn.prepared:
+        cur.execute(f"PREPARE {name} AS {_statements[name]}")
+        conn.prepared.add(name)
+    if params:
+        placeholders = ", ".join(["%s"] * len(params))
+        cur.execute(f"EXECUTE {name} ({placeholders})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+
+# Returns the current request's RequestStats, or None outside a request
+def current_request_stats():
+    return _request_stats.get()
+
+
+# Installs per-request SQL metrics on a Flask app: Server-Timing header,
+# slow-query log and a warning for statements repeated within one request
+def init_request_metrics(app):
+    from flask import g
+
+    @app.before_request
+    def _start_db_stats():
+        g._db_stats_token = _request_stats.set(RequestStats())
+
+    @app.after_request
+    def _emit_db_stats(response):
+        stats = _request_stats.get()
+        if stats is None:
+            return response
+        response.headers.add("Server-Timing", stats.server_timing())
+        for sql, n in stats.repeated().items():
+            log.warning("statement repeated %d times in one request: %s", n, sql[:500])
+        if stats.db_ms >= DB_SLOW_QUERY_MS:
+            log.warning(
+                "slow request: %d queries, %.1f ms in DB, %.1f ms acquiring, "
+                "slowest %.1f ms: %s",
+                stats.query_count, stats.db_ms, stats.acquire_ms,
+                stats.slowest_ms, (stats.slowest_sql or "")[:500],
+            )
+        return response
+
+    @app.teardown_request
+    def _reset_db_stats(exc):
+        token = g.pop("_db_stats_token", None)
+        if token is not None:
+            _request_stats.reset(token)
@@ -0,0 +1,129 @@
+"""Fixed-memory per-IP rate limiter shared by all worker processes on a host.
+
+Counters live in a memory-mapped file (under /dev/shm when available) split
+into shards. Each shard is an open-addressed table of fixed-size slots guarded
+by a byte-range file lock (across processes) plus a thread lock (within one).
+When a probe finds neither the key nor a free slot, the slot with the oldest
+window and fewest hits is evicted, so memory never grows with the number of
+distinct IPs.
+
+Counting uses a sliding-window counter: the previous fixed window's count,
+weighted by how much of it still overlaps the sliding window, plus the current
+window's count.
+"""
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+IP_LIMITER_DIR = os.environ.get("IP_LIMITER_DIR") or (
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+)
+IP_LIMITER_SHARDS = int(os.environ.get("IP_LIMITER_SHARDS", 64))
+IP_LIMITER_SLOTS_PER_SHARD = int(os.environ.get("IP_LIMITER_SLOTS_PER_SHARD", 256))
+
+# Slots probed per lookup before evicting
+_PROBE = 16
+# key hash, window index, hits in that window, hits in the window before
+_SLOT = struct.Struct("<QIII")
+
+
+class SharedRateLimiter:
+    def __init__(self, name, window_seconds, shards=None, slots_per_shard=None):
+        self.path = os.path.join(IP_LIMITER_DIR, f"extsearch-{name}.bin")
+        self.window = window_seconds
+        self.shards = shards or IP_LIMITER_SHARDS
+        self.slots = slots_per_shard or IP_LIMITER_SLOTS_PER_SHARD
+        self.shard_bytes = self.slots * _SLOT.size
+        self.size = self.shards * self.shard_bytes
+        self._fd = None
+        self._map = None
+        self._pid = None
+        self._locks = None
+        self._open_lock = threading.Lock()
+
+    # Mapping and thread locks are (re)created per process; a lock held
+    # by another thread at fork time must not carry over into the child
+    def _ensure_open(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._open_lock:
+            if self._pid == pid:
+                return
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < self.size:
+                    os.ftruncate(fd, self.size)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, self.size)
+            self._fd = fd
+            self._locks = [threading.Lock() for _ in range(self.shards)]
+            self._pid = pid
+
+    def _estimate(self, now, window_idx, current, previous):
+        overlap = 1 - (now - window_idx * self.window) / self.window
+        return previous * overlap + current
+
+    # Seconds until the estimate drops below `limit` with no further hits
+    def _retry_after(self, now, window_idx, current, previous, limit):
+        window_start = window_idx * self.window
+        if current >= limit:
+            # Clears during the next window, once this one's weight decays enough
+            at = window_start + self.window + self.window * (1 - limit / current)
+        else:
+            at = window_start + self.window * (1 - (limit - current) / previous)
+        return max(1, math.ceil(at - now))
+
+    # Counts `cost` hits (e.g. KiB sent) for `key` unless it is already over
+    # `limit`; cost=0 only checks. Returns (allowed, retry_after_seconds)
+    def hit(self, key, limit, now=None, cost=1):
+        self._ensure_open()
+        now = time.time() if now is None else now
+        window_idx = int(now // self.window)
+        digest = int.from_bytes(
+            hashlib.blake2b(key.encode(), digest_size=8).digest(), "little"
+        ) or 1
+        shard = digest % self.shards
+        base = shard * self.shard_bytes
+        start = (digest // self.shards) % self.slots
+
+        with self._locks[shard]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self.shard_bytes, base)
+            try:
+                offset = victim = None
+                victim_rank = None
+                for i in range(_PROBE):
+                    off = base + ((start + i) % self.slots) * _SLOT.size
+                    slot_key, win, cur, prev = _SLOT.unpack_from(self._map, off)
+                    if slot_key == digest:
+                        offset = off
+                        break
+                    if slot_key == 0:
+                        victim = off
+                        break
+                    rank = (win, cur)
+                    if victim_rank is None or rank < victim_rank:
+                        victim, victim_rank = off, rank
+                if offset is None:
+                    offset = victim
+                    win, cur, prev = window_idx, 0, 0
+                elif win != window_idx:
+                    prev = cur if win == window_idx - 1 else 0
+                    cur = 0
+                    win = window_idx
+
+                if self._estimate(now, win, cur, prev) >= limit:
+                    _SLOT.pack_into(self._map, offset, digest, win, cur, prev)
+                    return False, self._retry_after(now, win, cur, prev, limit)
+                _SLOT.pack_into(self._map, offset, digest, win, cur + cost, prev)
+                return True, 0
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.shard_bytes, base)
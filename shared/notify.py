@@ -0,0 +1,140 @@
+"""Postgres LISTEN/NOTIFY fan-out to waiting request threads.
+
+Writers call notify(cur, channel, payload) inside their transaction; the
+message is delivered when it commits. Each web process keeps one dedicated
+connection per channel, LISTENing on a background thread, and hands every
+message to the threads subscribed to its payload["id"] and to every
+channel-wide callback. Waiting costs no
+pooled connection, so a request can block until its submission changes
+without polling the database.
+"""
+import json
+import logging
+import select
+import threading
+import time
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from shared.db import get_connection
+
+RECONNECT_SECONDS = 5
+
+log = logging.getLogger(__name__)
+
+
+# Queues payload (a JSON-serialisable dict with an "id") on `channel`
+def notify(cur, channel, payload):
+    cur.execute("SELECT pg_notify(%s, %s)", (channel, json.dumps(payload)))
+
+
+class _Subscription:
+    def __init__(self):
+        self.event = threading.Event()
+        self.payload = None
+        self.waiters = 0
+
+    # Payload of the next message for this id, or None on timeout
+    def wait(self, timeout):
+        if not self.event.wait(timeout):
+            return None
+        return self.payload
+
+
+class Listener:
+    """One LISTEN connection for a channel, started on first subscribe."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.connected = False
+        self._subs = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name=f"listen-{self.channel}", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            conn = None
+            try:
+                conn = get_connection()
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{self.channel}"')
+                self.connected = True
+                while True:
+                    if select.select([conn], [], [], RECONNECT_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._dispatch(conn.notifies.pop(0).payload)
+            except (psycopg2.Error, OSError) as exc:
+                log.warning("listener on %s lost its connection: %s", self.channel, exc)
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+            time.sleep(RECONNECT_SECONDS)
+
+    def _dispatch(self, raw):
+        try:
+            payload = json.loads(raw)
+            key = payload["id"]
+        except (ValueError, TypeError, KeyError):
+            return
+        with self._lock:
+            sub = self._subs.get(key)
+            callbacks = list(self._callbacks)
+        if sub is not None:
+            sub.payload = payload
+            sub.event.set()
+        for callback in callbacks:
+            try:
+                callback(payload)
+            except Exception:
+                log.exception("%s callback failed", self.channel)
+
+    # Calls callback(payload) on the listener thread for every message
+    def add_callback(self, callback):
+        with self._lock:
+            self._ensure_thread()
+            self._callbacks.append(callback)
+
+    # Registers interest in messages for `key`; check the current state only
+    # after subscribing, or a message sent in between is missed
+    def subscribe(self, key):
+        with self._lock:
+            self._ensure_thread()
+            sub = self._subs.get(key)
+            if sub is None:
+                sub = self._subs[key] = _Subscription()
+            sub.waiters += 1
+        return sub
+
+    def unsubscribe(self, key, sub):
+        with self._lock:
+            sub.waiters -= 1
+            if sub.waiters <= 0 and self._subs.get(key) is sub:
+                del self._subs[key]
+
+
+_listeners = {}
+_listeners_lock = threading.Lock()
+
+
+def get_listener(channel):
+    with _listeners_lock:
+        listener = _listeners.get(channel)
+        if listener is None:
+            listener = _listeners[channel] = Listener(channel)
+        return listener
@@ -0,0 +1,51 @@
+import base64
+import binascii
+import json
+
+
+# Opaque, URL-safe page token for a keyset cursor payload
+def encode_cursor(payload):
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+# Returns payload dict or None for a missing or malformed token
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get("k"), list):
+        return None
+    if not isinstance(payload.get("p", 1), int) or payload.get("p", 1) < 1:
+        return None
+    return payload
+
+
+# Trims rows fetched with LIMIT per_page + 1 and builds next/prev tokens.
+# Backward pages are fetched in reverse order and flipped here.
+# Returns (rows, page_info); page_info["prev"] is None when the previous page is the first.
+def keyset_page(rows, per_page, cursor, key, total=None):
+    backward = bool(cursor and cursor.get("b"))
+    page = cursor.get("p", 1) if cursor else 1
+    has_more = len(rows) > per_page
+    rows = list(rows[:per_page])
+    if backward:
+        rows.reverse()
+        has_prev, has_next = has_more, True
+        if not has_more:
+            page = 1
+    else:
+        has_prev, has_next = cursor is not None, has_more
+
+    info = {"page": page, "total": total, "has_prev": has_prev, "next": None, "prev": None}
+    if rows and has_next:
+        info["next"] = encode_cursor({"k": key(rows[-1]), "p": page + 1, "t": total})
+    if rows and has_prev and page > 2:
+        info["prev"] = encode_cursor(
+            {"k": key(rows[0]), "b": True, "p": page - 1, "t": total}
+        )
+    return rows, info
@@ -1,9 +1,39 @@
 import os
-from shared.db import get_cursor
+from shared.db import execute_prepared, get_cursor, register_statement
 
 RATE_LIMIT_WINDOW_SECONDS = int(os.environ.get("RATE_LIMIT_WINDOW", 3600))
 RATE_LIMIT_MAX = int(os.environ.get("RATE_LIMIT_MAX", 60))
 
+# Submissions are counted in per-minute buckets (rate_limit_buckets), so a
+# check reads at most window/60 rows and answers in one round trip.
+register_statement(
+    "rate_limit_window",
+    """
+    SELECT COALESCE(SUM(count), 0) AS cnt,
+           EXTRACT(EPOCH FROM (
+               MIN(bucket_start) + $2 * INTERVAL '1 second'
+               + INTERVAL '1 minute' - NOW()
+           )) AS retry
+    FROM rate_limit_buckets
+    WHERE user_id = $1
+      AND bucket_start > NOW() - $2 * INTERVAL '1 second' - INTERVAL '1 minute'
+    """,
+)
+register_statement(
+    "rate_limit_record",
+    """
+    WITH pruned AS (
+        DELETE FROM rate_limit_buckets
+        WHERE user_id = $1
+          AND bucket_start < NOW() - $2 * INTERVAL '1 second' - INTERVAL '1 minute'
+    )
+    INSERT INTO rate_limit_buckets (user_id, bucket_start, count)
+    VALUES ($1, date_trunc('minute', NOW()), 1)
+    ON CONFLICT (user_id, bucket_start)
+    DO UPDATE SET count = rate_limit_buckets.count + 1
+    """,
+)
+
 
 # Returns (allowed, info_dict)
 def check_rate_limit(user_id):
@@ -15,37 +45,32 @@ def check_rate_limit(user_id):
         }
 
     with get_cursor(commit=False) as (conn, cur):
-        cur.execute(
-            """
-            SELECT COUNT(*) AS cnt,
-                   MIN(created_at) AS oldest
-            FROM submissions
-            WHERE user_id = %s
-              AND created_at > NOW() - INTERVAL '%s seconds'
-            """,
-            (user_id, RATE_LIMIT_WINDOW_SECONDS),
+        execute_prepared(
+            cur, "rate_limit_window", (user_id, RATE_LIMIT_WINDOW_SECONDS)
         )
         row = cur.fetchone()
-        count = row["cnt"]
-        remaining = max(0, RATE_LIMIT_MAX - count)
+    count = int(row["cnt"])
+    remaining = max(0, RATE_LIMIT_MAX - count)
 
-        info = {
-            "remaining": remaining,
-            "limit": RATE_LIMIT_MAX,
-            "window_seconds": RATE_LIMIT_WINDOW_SECONDS,
-            "used": count,
-        }
+    info = {
+        "remaining": remaining,
+        "limit": RATE_LIMIT_MAX,
+        "window_seconds": RATE_LIMIT_WINDOW_SECONDS,
+        "used": count,
+    }
 
-        if count >= RATE_LIMIT_MAX:
-            if row["oldest"]:
-                cur.execute(
-                    "SELECT EXTRACT(EPOCH FROM (%s + INTERVAL '%s seconds' - NOW())) AS retry",
-                    (row["oldest"], RATE_LIMIT_WINDOW_SECONDS),
-                )
-                retry_row = cur.fetchone()
-                info["retry_after"] = max(1, int(retry_row["retry"]))
-            else:
-                info["retry_after"] = RATE_LIMIT_WINDOW_SECONDS
-            return False, info
-
-        return True, info
+    if count >= RATE_LIMIT_MAX:
+        if row["retry"] is not None:
+            info["retry_after"] = max(1, int(row["retry"]))
+        else:
+            info["retry_after"] = RATE_LIMIT_WINDOW_SECONDS
+        return False, info
+
+    return True, info
+
+
+# Counts one submission; call with the cursor that inserts it so both commit together
+def record_submission(cur, user_id):
+    if user_id is None:
+        return
+    execute_prepared(cur, "rate_limit_record", (user_id, RATE_LIMIT_WINDOW_SECONDS))
@@ -1,15 +1,63 @@
 import os
 import requests
 
+from shared.auth_client import auth_request
+from shared.cache import LRUCache
+
 AUTH_SERVER_URL = os.environ.get("AUTH_SERVER_URL", "").rstrip("/")
 
+# user_id -> username; None caches "unknown" so missing ids are not re-fetched
+USERNAME_CACHE_TTL = float(os.environ.get("USERNAME_CACHE_TTL", 600))
+USERNAME_NEGATIVE_TTL = float(os.environ.get("USERNAME_NEGATIVE_TTL", 60))
+_username_cache = LRUCache(
+    max_entries=int(os.environ.get("USERNAME_CACHE_ENTRIES", 10000)),
+    ttl=USERNAME_CACHE_TTL,
+)
+_MISSING = object()
+
 
-# Returns {user_id: username} for resolved IDs
+# Returns {user_id: username} for resolved IDs; only cache misses are fetched
 def resolve_usernames(user_ids):
-    user_ids = [uid for uid in user_ids if uid is not None]
+    user_ids = {uid for uid in user_ids if uid is not None}
     if not user_ids:
         return {}
 
+    resolved = {}
+    misses = []
+    for uid in user_ids:
+        name = _username_cache.get(uid, _MISSING)
+        if name is _MISSING:
+            misses.append(uid)
+        elif name is not None:
+            resolved[uid] = name
+    if not misses:
+        return resolved
+
+    fetched = _resolve_uncached(misses)
+    if fetched is None:
+        # Auth side unavailable (or breaker open): fall back to expired entries
+        for uid in misses:
+            name = _username_cache.peek(uid)
+            if name is not None:
+                resolved[uid] = name
+        return resolved
+    for uid in misses:
+        name = fetched.get(uid)
+        if name is None:
+            _username_cache.set(uid, None, ttl=USERNAME_NEGATIVE_TTL)
+        else:
+            _username_cache.set(uid, name)
+            resolved[uid] = name
+    return resolved
+
+
+# Hit ratio and size of the username cache, for monitoring
+def username_cache_stats():
+    return _username_cache.stats()
+
+
+# Returns {user_id: username}, or None if the lookup itself failed
+def _resolve_uncached(user_ids):
     if AUTH_SERVER_URL:
         return _resolve_via_auth_server(user_ids)
     return _resolve_direct(user_ids)
@@ -17,11 +65,7 @@ def resolve_usernames(user_ids):
 
 def _resolve_via_auth_server(user_ids):
     try:
-        r = requests.post(
-            f"{AUTH_SERVER_URL}/auth/users/batch",
-            json={"user_ids": user_ids},
-            timeout=5,
-        )
+        r = auth_request("POST", "/auth/users/batch", json={"user_ids": user_ids})
         if r.status_code == 200:
             data = r.json().get("users", {})
             return {
@@ -30,7 +74,7 @@ def _resolve_via_auth_server(user_ids):
             }
     except (requests.RequestException, ValueError, KeyError):
         pass
-    return {}
+    return None
 
 
 def _resolve_direct(user_ids):